@@ -1,28 +1,121 @@
 # app_complete_with_analytics.py - Enhanced with Analytics & Image Upload
 
 
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify
+from markupsafe import Markup, escape
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-import sqlite3
-from datetime import datetime
-import random
+from db import get_db
+import db
+import metrics
+import migrations
+from storage import store_upload, UploadTooLarge
+from images import make_derivatives, VariantResolver
+from tasks import LocalTaskQueue, SQLiteJobQueue
+from cache import ResultCache, content_key
+from classifiers import ClassifierHandle, KeywordClassifier, LinearClassifier, publish_model, saved_model_version
+from dedup import minhash_signature, index_signature, find_near_duplicates
+from stats import get_counters, rebuild_counters
+from sources import TopicRouter, SourceSetStore, load_topics
+from metrics import timed
+from changes import get_versions
+from compression import compress_response
+from events import EventBroker, sse_stream
+import atexit
+import click
+import csv
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 import json
+import math
 import os
+import threading
+import time
 # Imported for file path handling
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'
+app.config['DATABASE'] = 'fake_news_detection.db'
 app.config['UPLOAD_FOLDER'] = 'static/uploads' # Define the upload directory
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
+app.config['MAX_UPLOAD_BYTES'] = 10 * 1024 * 1024 # Largest accepted article image
+app.config['MAX_FORM_TEXT_BYTES'] = 5 * 1024 * 1024 # Allowance for title and text in the same request
+app.config['PRECOMPILE_TEMPLATES'] = True # Compile templates/ at import instead of on first use
+app.config['PAGE_SIZE'] = 25 # Articles per page in dashboard lists
+app.config['SEARCH_RESULTS'] = 50 # Maximum hits returned by /search
+app.config['INGEST_BATCH_SIZE'] = 500 # Articles per transaction for bulk imports
+app.config['CLASSIFIER_WORKERS'] = None # Batch classification processes (None = one per CPU)
+app.config['CLASSIFIER_CHUNK_SIZE'] = 64 # Articles sent to a worker process at a time
+app.config['TASK_WORKERS'] = 2 # Threads for background jobs such as image thumbnails
+app.config['CLASSIFICATION_CACHE_SIZE'] = 10000 # In-process cached classification results
+app.config['CLASSIFICATION_CACHE_TTL'] = 3600 # Seconds before an in-process entry expires
+app.config['CLASSIFICATION_CACHE_DB_ROWS'] = 200000 # Results kept in the classification_cache table, newest first
+app.config['CLASSIFICATION_CACHE_DB_TTL'] = 30 * 24 * 3600 # Seconds before a classification_cache row is purged
+app.config['DUPLICATE_THRESHOLD'] = 0.8 # Estimated similarity at which a submission counts as a near-duplicate
+app.config['CLASSIFIER_ENGINE'] = 'keyword' # 'keyword' heuristic or trained 'linear' TF-IDF model
+app.config['CLASSIFIER_MODEL_PATH'] = 'models/linear.npz' # Written by `flask train-classifier`
+app.config['CLASSIFIER_RELOAD_INTERVAL'] = 30 # Seconds between checks for a newly trained model
+app.config['TRAINING_CHUNK_SIZE'] = 1000 # Labelled articles read per training step
+app.config['SOURCE_TOPICS_FILE'] = None # JSON topic -> keywords/sources table (None = built-in table in sources.py)
+app.config['ASYNC_CLASSIFICATION'] = False # Save submissions at once and classify them on background workers
+app.config['CLASSIFICATION_QUEUE_WORKERS'] = 2 # Threads draining the classification job queue
+app.config['CLASSIFICATION_QUEUE_BATCH'] = 32 # Submissions classified per job batch
+app.config['CLASSIFICATION_QUEUE_POLL'] = 1.0 # Seconds an idle worker waits before checking the queue again
+app.config['REVIEW_BATCH_SIZE'] = 10 # Pending articles leased to a reviewer at a time
+app.config['REVIEW_LEASE_SECONDS'] = 900 # How long a claim lasts without the reviewer coming back
+app.config['PROFILE_SLOW_REQUESTS'] = None # Seconds; profile every request and keep those slower than this
+app.config['PROFILE_DIR'] = 'profiles' # Where slow-request cProfile dumps are written
+app.config['API_COMPRESS_MIN_BYTES'] = 1024 # JSON API responses at least this large are gzip/brotli encoded
+app.config['EVENT_HISTORY'] = 1000 # Recent queue events kept for reconnecting /reviewer/events clients
+app.config['EVENT_QUEUE_SIZE'] = 500 # Undelivered events a client may fall behind by before it is dropped
+app.config['SSE_HEARTBEAT_SECONDS'] = 15 # Keep-alive comment interval on idle event streams
+db.init_app(app)
+metrics.init_app(app)
+
+def lazy_service(factory):
+    """Getter that builds factory() on first call and returns that same object afterwards.
+
+    Services are built from app.config when first used, not at import, so settings
+    changed after importing the app (tests, scripts, instance config) take effect.
+    """
+    lock = threading.Lock()
+    built = []
+
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+    return get
+
+# Background jobs (image thumbnails) and the template filter that picks up their output
+get_image_tasks = lazy_service(lambda: LocalTaskQueue(app.config['TASK_WORKERS']))
+get_variant_resolver = lazy_service(lambda: VariantResolver(app.config['UPLOAD_FOLDER'],
+                                                            app.static_url_path + '/uploads'))
+
+@app.template_filter('image_variant')
+def image_variant(image_path, variant='thumb'):
+    return get_variant_resolver()(image_path, variant)
+
+get_source_router = lazy_service(lambda: TopicRouter(load_topics(app.config['SOURCE_TOPICS_FILE'])))
+source_sets = SourceSetStore()
+get_classifier = lazy_service(lambda: ClassifierHandle(app.config['CLASSIFIER_ENGINE'], app.config['CLASSIFIER_MODEL_PATH'],
+                                                       app.config['CLASSIFIER_RELOAD_INTERVAL']))
+get_classification_cache = lazy_service(lambda: ResultCache(
+    app.config['CLASSIFICATION_CACHE_SIZE'], app.config['CLASSIFICATION_CACHE_TTL'],
+    app.config['CLASSIFICATION_CACHE_DB_ROWS'], app.config['CLASSIFICATION_CACHE_DB_TTL']))
+# Queue changes pushed to reviewers' browsers; only reaches clients connected to this process
+get_queue_events = lazy_service(lambda: EventBroker(app.config['EVENT_HISTORY'], app.config['EVENT_QUEUE_SIZE']))
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 def init_db():
-    """Initialize database with users and articles tables and default users."""
-    conn = sqlite3.connect('fake_news_detection.db')
+    """Initialize database with users and articles tables and default users, then apply migrations."""
+    conn = get_db()
     c = conn.cursor()
         
     c.execute('''CREATE TABLE IF NOT EXISTS users (
@@ -65,199 +158,328 @@ def init_db():
         ]
         c.executemany('INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)', default_users)
         conn.commit()
-    conn.close()
+
+    # Everything after the base tables is a versioned migration
+    return migrations.migrate(conn)
+
+def publish_queue_event(conn, event, data):
+    """Push a committed change to connected reviewers, along with the new pending total.
+
+    The total costs one counters lookup per change, however many reviewers are listening.
+    """
+    data['pending'] = get_counters(conn, 'all')['pending']
+    get_queue_events().publish(event, data)
 
 def get_reliable_sources(title):
-    """Mock external search for reliable sources"""
-    topic = "General News"
-    if "climate" in title.lower():
-        topic = "Climate Science"
-    elif "vaccine" in title.lower() or "health" in title.lower():
-        topic = "Health"
-    elif "earnings" in title.lower() or "stock" in title.lower():
-        topic = "Finance"
-    
-    if topic == "Climate Science":
-        sources = [
-            {"title": "NASA Climate Change", "uri": "https://climate.nasa.gov/"},
-            {"title": "NOAA Climate.gov", "uri": "https://www.climate.gov/"}
-        ]
-    elif topic == "Health":
-        sources = [
-            {"title": "CDC - Centers for Disease Control", "uri": "https://www.cdc.gov/"},
-            {"title": "WHO - World Health Organization", "uri": "https://www.who.int/"}
-        ]
-    elif topic == "Finance":
-        sources = [
-            {"title": "Wall Street Journal", "uri": "https://www.wsj.com/"},
-            {"title": "Bloomberg", "uri": "https://www.bloomberg.com/"}
-        ]
-    else:
-        sources = [
-            {"title": "Associated Press News", "uri": "https://apnews.com/"},
-            {"title": "Reuters Fact-Check", "uri": "https://www.reuters.com/fact-check/"}
-        ]
-    return json.dumps(sources)
+    """Reliable sources for the title's topic, as interned JSON"""
+    return get_source_router().route(title).json
 
+def source_set_ids(conn, sources_jsons):
+    """source_set_id for each JSON source list, interning each distinct list once. Caller commits."""
+    sources_jsons = list(sources_jsons)
+    ids = {sources_json: source_sets.intern(conn, sources_json) for sources_json in set(sources_jsons)}
+    return [ids[sources_json] for sources_json in sources_jsons]
+
+@timed('classify')
 def classify_article(text, title):
-    """Enhanced ML classification"""
-    fake_keywords = {
-        'hoax': 3, 'conspiracy': 3, 'unverified': 2, 'shocking': 2,
-        'miracle cure': 4, 'secret': 2, 'breaking': 2, 'exposed': 2,
-        'they don\'t want you to know': 4, 'incredible': 1, 'amazing': 1
-    }
-    real_keywords = {
-        'according to': 3, 'research shows': 4, 'official statement': 4,
-        'confirmed': 3, 'study': 3, 'experts': 2, 'published': 2,
-        'peer-reviewed': 4, 'data indicates': 3, 'report': 2
-    }
-        
-    text_lower = text.lower()
-    fake_score = sum(weight for keyword, weight in fake_keywords.items() if keyword in text_lower)
-    real_score = sum(weight for keyword, weight in real_keywords.items() if keyword in text_lower)
-        
-    has_sources = bool(any(word in text_lower for word in ['source:', 'according to', 'cited', 'reference']))
-    has_dates = bool(any(char.isdigit() for char in text[:100]))
-    word_count = len(text.split())
-        
-    if has_sources:
-        real_score += 2
-    if has_dates:
-        real_score += 1
-    if word_count < 50:
-        fake_score += 2
-        
-    total_score = fake_score + real_score
-    if total_score > 0:
-        score_diff = abs(fake_score - real_score)
-        confidence = 0.60 + min(score_diff / total_score, 0.35)
+    """Predict Real/Fake with the configured engine and attach reliable sources"""
+    prediction, confidence = get_classifier().get().predict(title, text)
+    return prediction, confidence, get_reliable_sources(title)
+
+_classifier_pool = None
+
+def get_classifier_pool():
+    """Lazily start the shared process pool used for batch classification."""
+    global _classifier_pool
+    if _classifier_pool is None:
+        _classifier_pool = ProcessPoolExecutor(max_workers=app.config['CLASSIFIER_WORKERS'])
+        atexit.register(_classifier_pool.shutdown)
+    return _classifier_pool
+
+def _predict_pair(model, pair):
+    title, text = pair
+    return model.predict(title, text)
+
+def map_in_pool(func, items):
+    """Apply a top-level function to every item, spreading chunks across worker processes.
+
+    A functools.partial of one works too, so callers can pass extra picklable arguments.
+    Batches smaller than one chunk run inline, since shipping them to a worker
+    costs more than the work itself.
+    """
+    items = list(items)
+    chunk_size = app.config['CLASSIFIER_CHUNK_SIZE']
+    if app.config['CLASSIFIER_WORKERS'] == 1 or len(items) <= chunk_size:
+        return [func(item) for item in items]
+    return list(get_classifier_pool().map(func, items, chunksize=chunk_size))
+
+@timed('classify')
+def classify_articles(pairs, model=None):
+    """Classify many (title, text) pairs with model (default: the live classifier).
+
+    Batched engines score the whole list as one matrix product; the rest are spread
+    over worker processes when the batch is large.
+    """
+    pairs = list(pairs)
+    model = model or get_classifier().get()
+    if model.batched:
+        predictions = model.predict_batch(pairs)
     else:
-        confidence = 0.55
-        
-    if fake_score > real_score:
-        prediction = 'Fake'
-    elif real_score > fake_score:
-        prediction = 'Real'
-    else:
-        prediction = random.choice(['Real', 'Fake'])
-        confidence = 0.55
-        
-    return prediction, min(confidence, 0.95), get_reliable_sources(title)
-
-# Enhanced HTML with Chart.js for visualizations (Background color is the soft light gradient)
-BASE_HTML = '''<!DOCTYPE html><html><head>
-    <title>Fake News Detection System</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&family=Space+Grotesk:wght@500;700&display=swap" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        :root {
-            --primary: #2563eb; --primary-dark: #1e40af; --secondary: #7c3aed;
-            --success: #10b981; --danger: #ef4444; --warning: #f59e0b;
-            --gray-50: #f9fafb; --gray-100: #f3f4f6; --gray-200: #e5e7eb;
-            --gray-600: #4b5563; --gray-700: #374151; --gray-900: #111827;
-        }
-        body {
-            font-family: 'Inter', sans-serif;
-            background: linear-gradient(135deg, #e0f7fa 0%, #f1f8e9 100%); 
-            min-height: 100vh; position: relative; overflow-x: hidden;
-        }
-        @keyframes fadeInUp { from { opacity: 0; transform: translateY(40px); } to { opacity: 1; transform: translateY(0); } }
-        .container { max-width: 1400px; margin: 0 auto; padding: 20px; position: relative; z-index: 1; }
-        .navbar {
-            background: rgba(255, 255, 255, 0.98); backdrop-filter: blur(20px);
-            padding: 24px 40px; box-shadow: 0 10px 40px rgba(0, 0, 0, 0.12);
-            margin-bottom: 35px; display: flex; justify-content: space-between;
-            align-items: center; border-radius: 20px; animation: fadeInUp 0.7s;
-        }
-        .navbar h1 {
-            background: linear-gradient(135deg, var(--primary), var(--secondary));
-            -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-            font-size: 32px; font-weight: 900; font-family: 'Space Grotesk', sans-serif;
-            display: flex; align-items: center; gap: 12px;
-        }
-        .navbar h1::before { content: '🛡️'; font-size: 36px; }
-        .navbar .user-info span {
-            color: var(--gray-700); font-weight: 600; padding: 10px 20px;
-            background: linear-gradient(135deg, var(--gray-100), var(--gray-50));
-            border-radius: 25px; font-size: 14px;
-        }
-        .btn {
-            padding: 12px 32px; background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-            color: white; border: none; border-radius: 14px; cursor: pointer;
-            font-weight: 700; font-size: 14px; transition: all 0.3s;
-            box-shadow: 0 4px 20px rgba(37, 99, 235, 0.4);
-            text-decoration: none; display: inline-flex; align-items: center; gap: 8px;
-        }
-        .btn-danger { background: linear-gradient(135deg, var(--danger), #dc2626); }
-        .btn-success { background: linear-gradient(135deg, var(--success), #059669); }
-        .card {
-            background: rgba(255, 255, 255, 0.98); backdrop-filter: blur(20px);
-            padding: 35px; border-radius: 24px; box-shadow: 0 10px 40px rgba(0, 0, 0, 0.12);
-            margin-bottom: 30px; animation: fadeInUp 0.7s; transition: all 0.4s; position: relative;
-        }
-        .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(320px, 1fr)); gap: 30px; }
-        .stat-card {
-            background: rgba(255, 255, 255, 0.98); backdrop-filter: blur(20px);
-            padding: 30px; border-radius: 24px; box-shadow: 0 10px 40px rgba(0, 0, 0, 0.12);
-            transition: all 0.4s; animation: scaleIn 0.6s; position: relative;
-        }
-        .stat-card .number {
-            font-size: 56px; font-weight: 900; margin: 15px 0;
-            background: linear-gradient(135deg, var(--primary), var(--secondary));
-            -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-            font-family: 'Space Grotesk', sans-serif;
-        }
-        .chart-container {
-            position: relative; height: 300px; margin: 20px 0;
-        }
-        .form-group { margin-bottom: 24px; }
-        .form-group label { display: block; margin-bottom: 10px; color: var(--gray-900); font-weight: 700; }
-        .form-group input, .form-group textarea, .form-group select {
-            width: 100%; padding: 16px 20px; border: 2px solid var(--gray-200);
-            border-radius: 14px; font-size: 15px; font-family: 'Inter', sans-serif;
-            transition: all 0.3s; background: white;
-        }
-        .alert {
-            padding: 18px 24px; border-radius: 16px; margin-bottom: 24px;
-            font-weight: 600; display: flex; align-items: center; gap: 12px;
-        }
-        .alert-error { background: linear-gradient(135deg, #fee2e2, #fecaca); color: #991b1b; border: 2px solid var(--danger); }
-        .article-item {
-            border: 2px solid var(--gray-200); padding: 24px; border-radius: 18px;
-            margin-bottom: 20px; transition: all 0.3s; background: linear-gradient(135deg, #ffffff, #fafafa);
-        }
-        .badge {
-            display: inline-flex; align-items: center; gap: 6px; padding: 8px 16px;
-            border-radius: 20px; font-size: 12px; font-weight: 800; text-transform: uppercase;
-        }
-        .badge-real { background: linear-gradient(135deg, #d1fae5, #a7f3d0); color: #065f46; border: 2px solid var(--success); }
-        .badge-fake { background: linear-gradient(135deg, #fee2e2, #fecaca); color: #991b1b; border: 2px solid var(--danger); }
-        .badge-pending { background: linear-gradient(135deg, #fef3c7, #fde68a); color: #92400e; border: 2px solid var(--warning); }
-        .login-container {
-            max-width: 500px; margin: 80px auto; background: rgba(255, 255, 255, 0.98);
-            padding: 50px; border-radius: 32px; box-shadow: 0 25px 80px rgba(0, 0, 0, 0.4);
-        }
-        .demo-accounts {
-            background: linear-gradient(135deg, #dbeafe, #bfdbfe); padding: 24px;
-            border-radius: 20px; margin-top: 30px; font-size: 13px; border: 2px solid var(--primary);
-        }
-        .article-image {
-            max-width: 100%;
-            height: auto;
-            border-radius: 12px;
-            margin-bottom: 15px;
-            border: 1px solid var(--gray-200);
-            box-shadow: 0 4px 10px rgba(0,0,0,0.05);
-        }
-        @media (max-width: 768px) {
-            .navbar { flex-direction: column; gap: 18px; }
-            .grid { grid-template-columns: 1fr; }
-        }
-    </style></head><body>
-    {% block content %}{% endblock %}
-</body></html>'''
+        # Workers get this model, not whichever one their own process has loaded
+        predictions = map_in_pool(functools.partial(_predict_pair, model), pairs)
+    return [(prediction, confidence, get_reliable_sources(title))
+            for (title, _), (prediction, confidence) in zip(pairs, predictions)]
+
+def flag_near_duplicate(conn, article_id, signature):
+    """Index an article's MinHash signature and link it to its closest near-duplicate.
+
+    A reviewed match is preferred, so the reviewer sees its verdict as a suggested label.
+    Otherwise the article joins the cluster of the closest pending copy. Caller commits.
+    """
+    if signature is None:
+        return
+    matches = find_near_duplicates(conn, signature, app.config['DUPLICATE_THRESHOLD'])
+    index_signature(conn, article_id, signature)
+    if not matches:
+        return
+    similarity_by_id = dict(matches)
+    placeholders = ', '.join('?' * len(similarity_by_id))
+    candidates = conn.execute(f'''SELECT id, status, duplicate_of FROM articles WHERE id IN ({placeholders})''',
+                              list(similarity_by_id)).fetchall()
+    if not candidates:
+        return
+    best = max(candidates, key=lambda row: (row['status'] != 'pending', similarity_by_id[row['id']]))
+    cluster_root = best['id'] if best['status'] != 'pending' else (best['duplicate_of'] or best['id'])
+    conn.execute('''UPDATE articles SET duplicate_of = ?, duplicate_similarity = ?
+                    WHERE id = ? AND status = 'pending' ''',
+                 (cluster_root, similarity_by_id[best['id']], article_id))
+
+def classify_cached(pairs):
+    """(prediction, confidence, source_set_id) for each pair, classifying repeated content once.
+
+    New results and their source sets are written on the request's connection and are
+    committed with the caller's transaction.
+    """
+    pairs = list(pairs)
+    conn = get_db()
+    # One model for the whole batch, so results are cached under the version that made them.
+    # The topic table picks the cached source set, so its version is part of the key too.
+    model = get_classifier().get()
+    namespace = f'{model.version}:{get_source_router().version}'
+    keys = [content_key(title, text, namespace) for title, text in pairs]
+    results = get_classification_cache().get_many(conn, keys)
+    source_sets.restore(conn, (set_id for _, _, set_id in results.values()))
+    missing = {}
+    for key, pair in zip(keys, pairs):
+        if key not in results:
+            missing.setdefault(key, pair)
+    if missing:
+        computed = classify_articles(missing.values(), model)
+        set_ids = source_set_ids(conn, (sources_json for _, _, sources_json in computed))
+        computed = {key: (prediction, confidence, set_id)
+                    for key, (prediction, confidence, _), set_id in zip(missing, computed, set_ids)}
+        get_classification_cache().put_many(conn, computed)
+        results.update(computed)
+    return [results[key] for key in keys]
+
+def classify_submissions(article_ids):
+    """Job handler: fill in the ML results of articles saved with the classifying marker.
+
+    Articles already classified are skipped, so a batch that is retried after a crash
+    does no harm.
+    """
+    with app.app_context():
+        conn = get_db()
+        placeholders = ', '.join('?' * len(article_ids))
+        rows = conn.execute(f'''SELECT id, title, text, submitted_at FROM articles
+                                 WHERE id IN ({placeholders}) AND classifying = 1''', article_ids).fetchall()
+        if not rows:
+            return
+        results = classify_cached((row['title'], row['text']) for row in rows)
+        signatures = map_in_pool(minhash_signature, [row['text'] for row in rows])
+        with conn:
+            conn.executemany('''UPDATE articles SET ml_prediction = ?, ml_confidence = ?, source_set_id = ?,
+                                                   classifying = 0
+                                WHERE id = ?''',
+                             [(prediction, confidence, set_id, row['id'])
+                              for row, (prediction, confidence, set_id) in zip(rows, results)])
+            for row, signature in zip(rows, signatures):
+                flag_near_duplicate(conn, row['id'], signature)
+        # Only now can reviewers claim them
+        publish_queue_event(conn, 'submitted', {'count': len(rows), 'articles': [
+            {'id': row['id'], 'title': row['title'], 'submitted_at': row['submitted_at'],
+             'ml_prediction': prediction, 'ml_confidence': confidence}
+            for row, (prediction, confidence, _) in zip(rows, results)]})
+
+def classify_submissions_fallback(article_ids):
+    """Dead-letter handler: classify articles whose jobs kept failing with the keyword heuristic.
+
+    This takes them out of the classifying state, so they reach the reviewers' queue
+    rather than waiting forever. The dead jobs stay listed by `flask job-queue`.
+    """
+    keyword_classifier = KeywordClassifier()
+    with app.app_context():
+        conn = get_db()
+        placeholders = ', '.join('?' * len(article_ids))
+        rows = conn.execute(f'''SELECT id, title, text, submitted_at FROM articles
+                                 WHERE id IN ({placeholders}) AND classifying = 1''', article_ids).fetchall()
+        if not rows:
+            return
+        results = [(*keyword_classifier.predict(row['title'], row['text']), get_reliable_sources(row['title']))
+                   for row in rows]
+        with conn:
+            set_ids = source_set_ids(conn, (sources_json for _, _, sources_json in results))
+            conn.executemany('''UPDATE articles SET ml_prediction = ?, ml_confidence = ?, source_set_id = ?,
+                                                   classifying = 0
+                                WHERE id = ?''',
+                             [(prediction, confidence, set_id, row['id'])
+                              for row, (prediction, confidence, _), set_id in zip(rows, results, set_ids)])
+        # Only now can reviewers claim them
+        publish_queue_event(conn, 'submitted', {'count': len(rows), 'articles': [
+            {'id': row['id'], 'title': row['title'], 'submitted_at': row['submitted_at'],
+             'ml_prediction': prediction, 'ml_confidence': confidence}
+            for row, (prediction, confidence, _) in zip(rows, results)]})
+
+get_classification_queue = lazy_service(lambda: SQLiteJobQueue(
+    'classify', lambda: db.connect(app.config['DATABASE']), classify_submissions,
+    app.config['CLASSIFICATION_QUEUE_WORKERS'], app.config['CLASSIFICATION_QUEUE_BATCH'],
+    app.config['CLASSIFICATION_QUEUE_POLL'], on_dead=classify_submissions_fallback))
+
+@app.before_request
+def start_classification_workers():
+    # Also drains jobs left over from before a restart
+    if app.config['ASYNC_CLASSIFICATION']:
+        get_classification_queue().start()
+
+def iter_article_records(stream, fmt):
+    """Yield (title, text) pairs from a JSONL or CSV text stream, one record at a time.
+
+    Malformed records are yielded as (None, None) so the caller can count them as skipped.
+    """
+    if fmt == 'csv':
+        # The csv module rejects fields over 128 KB; accept an article as long as the submit form does
+        csv.field_size_limit(max(csv.field_size_limit(), app.config['MAX_FORM_TEXT_BYTES']))
+        for row in csv.DictReader(stream):
+            yield row.get('title'), row.get('text')
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            yield record.get('title'), record.get('text')
+        except (ValueError, AttributeError):
+            yield None, None
+
+def insert_article_batch(conn, batch, submitted_by):
+    """Classify a batch of (title, text) pairs and insert them in a single transaction."""
+    submitted_at = datetime.now().isoformat()
+    results = classify_cached(batch)
+    signatures = map_in_pool(minhash_signature, [text for _, text in batch])
+    with conn:
+        rows = [(title, text, submitted_by, submitted_at, prediction, confidence, set_id)
+                for (title, text), (prediction, confidence, set_id) in zip(batch, results)]
+        conn.executemany('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction, ml_confidence, status, source_set_id)
+                            VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)''', rows)
+        # The transaction holds the write lock, so the batch received consecutive ids
+        last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        for article_id, signature in zip(range(last_id - len(rows) + 1, last_id + 1), signatures):
+            flag_near_duplicate(conn, article_id, signature)
+    return len(rows)
+
+class IngestError(Exception):
+    """The input became unreadable part-way through an import.
+
+    Batches read before that point are already committed; inserted and skipped count them.
+    """
+
+    def __init__(self, message, inserted, skipped):
+        super().__init__(message)
+        self.inserted = inserted
+        self.skipped = skipped
+
+def ingest_articles(records, submitted_by, batch_size=None):
+    """Stream (title, text) records into the articles table in chunked transactions.
+
+    Records without a non-empty string title and text are skipped. Returns (inserted,
+    skipped), or raises IngestError if the stream cannot be decoded or parsed.
+    """
+    batch_size = batch_size or app.config['INGEST_BATCH_SIZE']
+    inserted = skipped = 0
+    batch = []
+    conn = get_db()
+    failure = None
+    try:
+        for title, text in records:
+            if not isinstance(title, str) or not isinstance(text, str) or not title or not text:
+                skipped += 1
+                continue
+            batch.append((strip_markers(title), strip_markers(text)))
+            if len(batch) >= batch_size:
+                inserted += insert_article_batch(conn, batch, submitted_by)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as error:
+        failure = error
+    # Records read before a failure are still imported, so the counts say exactly what went in
+    if batch:
+        inserted += insert_article_batch(conn, batch, submitted_by)
+    if failure is not None:
+        raise IngestError(f'Unreadable input after {inserted + skipped} records: {failure}',
+                          inserted, skipped) from failure
+    return inserted, skipped
+
+# Sorts after every real (ISO timestamp, id) pair, so the first page needs no special case
+FIRST_PAGE_CURSOR = ('9999-12-31T23:59:59', 2 ** 63 - 1)
+
+def parse_cursor(value):
+    """Decode a 'timestamp_id' page cursor from the query string."""
+    if value:
+        timestamp, _, row_id = value.rpartition('_')
+        if timestamp and row_id.isdigit():
+            return timestamp, int(row_id)
+    return FIRST_PAGE_CURSOR
+
+def fetch_page(c, sql, params, cursor, sort_column):
+    """Run a keyset list query and return (rows, cursor for the next page or None)."""
+    page_size = app.config['PAGE_SIZE']
+    c.execute(sql, (*params, *cursor, page_size + 1))
+    rows = c.fetchall()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, f"{rows[-1][sort_column]}_{rows[-1]['id']}"
+
+# Filtered list queries behind the dashboards. `flask check-query-plans` runs EXPLAIN
+# QUERY PLAN over these, so keep them here rather than inline in the views.
+DASHBOARD_QUERIES = {
+    # Keyset-paginated lists: params end with the (timestamp, id) cursor and the page size.
+    # They select summary columns only; full text is fetched on demand from /articles/<id>/text.
+    'user_articles': '''SELECT id, title, submitted_at, ml_prediction, ml_confidence, classifying, status,
+                               final_verdict, source_set_id, image_path FROM articles
+                        WHERE submitted_by = ? AND (submitted_at, id) < (?, ?)
+                        ORDER BY submitted_at DESC, id DESC LIMIT ?''',
+    # The reviewer's live claims (see claim_articles), oldest first
+    'claimed_articles': '''SELECT a.id, a.title, substr(a.text, 1, 200) AS excerpt, a.submitted_at, a.ml_prediction,
+                                  a.ml_confidence, a.source_set_id, a.image_path, u.name as submitted_by_name,
+                                  a.duplicate_of, a.duplicate_similarity, d.final_verdict AS duplicate_verdict,
+                                  a.claim_expires_at
+                           FROM articles a JOIN users u ON a.submitted_by = u.id
+                           LEFT JOIN articles d ON d.id = a.duplicate_of
+                           WHERE a.claimed_by = ? AND a.status = 'pending' AND a.claim_expires_at >= ?
+                           ORDER BY a.submitted_at, a.id''',
+    'reviewer_articles': '''SELECT a.id, a.title, a.reviewed_at, a.final_verdict, a.needs_admin_review, a.admin_verified
+                            FROM articles a
+                            WHERE a.reviewed_by = ? AND (a.reviewed_at, a.id) < (?, ?)
+                            ORDER BY a.reviewed_at DESC, a.id DESC LIMIT ?''',
+    'reviewer_activity': '''SELECT u.name, COALESCE(s.completed, 0) AS reviewed_count FROM users u
+                            LEFT JOIN article_counters s ON s.scope = 'reviewer' AND s.owner_id = u.id
+                            WHERE u.role = 'reviewer' ORDER BY u.id''',
+    'admin_review_articles': '''SELECT a.*, u.name as submitted_by_name, r.name as reviewed_by_name FROM articles a
+                                JOIN users u ON a.submitted_by = u.id
+                                LEFT JOIN users r ON a.reviewed_by = r.id
+                                WHERE a.needs_admin_review = 1 AND a.admin_verified = 0 ORDER BY a.reviewed_at DESC''',
+}
 
 @app.route('/')
 def index():
@@ -277,12 +499,9 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        conn = sqlite3.connect('fake_news_detection.db')
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
+        c = get_db().cursor()
         c.execute('SELECT * FROM users WHERE email = ?', (email,))
         user = c.fetchone()
-        conn.close()
 
         if user and check_password_hash(user['password'], password):
             session['user_id'] = user['id']
@@ -291,286 +510,276 @@ def login():
             return redirect(url_for('index'))
         else:
             flash('Invalid email or password')
-            
-    html = BASE_HTML.replace('{% block content %}{% endblock %}', '''
-    <div class="login-container">
-        <div style="text-align:center;margin-bottom:30px;"><div style="font-size:72px;">🛡️</div></div>
-        <h1 style="text-align:center;color:var(--gray-900);margin-bottom:10px;font-size:32px;">Fake News Detection</h1>
-        <p style="text-align:center;color:var(--gray-600);margin-bottom:30px;">Multi-Level Verification</p>
-        {% with messages = get_flashed_messages() %}{% if messages %}{% for message in messages %}<div class="alert alert-error">{{ message }}</div>{% endfor %}{% endif %}{% endwith %}
-        <form method="POST">
-            <div class="form-group">
-                <label>📧 Email</label>
-                <input type="email" name="email" required>
-            </div>
-            <div class="form-group">
-                <label>🔒 Password</label>
-                <input type="password" name="password" required>
-            </div>
-            <button type="submit" class="btn" style="width:100%;justify-content:center;">Sign In</button>
-        </form>
-        <div class="demo-accounts">
-            <strong>🎯 Demo Accounts:</strong>
-            Admin: admin@system.com / admin123<br>
-            Reviewer: reviewer@system.com / reviewer123<br>
-            User: user@system.com / user123
-        </div>
-    </div>''')
-    return render_template_string(html)
+
+    return render_template('login.html')
 
 @app.route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('login'))
 
+def user_stats(conn, user_id):
+    """Summary of a submitter's articles, from the trigger-maintained counters."""
+    counters = get_counters(conn, 'submitter', user_id)
+    total_reviewed = counters['completed']
+    accuracy_rate = (counters['ai_correct'] / total_reviewed * 100) if total_reviewed > 0 else 0
+    return {
+        'total': counters['total'],
+        'reviewed': total_reviewed,
+        'pending': counters['total'] - total_reviewed,
+        'real': counters['verdict_real'],
+        'fake': counters['verdict_fake'],
+        'accuracy': accuracy_rate
+    }
+
 @app.route('/user/dashboard', methods=['GET', 'POST'])
 def user_dashboard():
     if 'user_id' not in session or session.get('user_role') != 'user':
         return redirect(url_for('login'))
 
     if request.method == 'POST':
-        title = request.form['title']
-        text = request.form['text']
-        prediction, confidence, sources_json = classify_article(text, title)
+        # Reject oversized submissions before the form body is parsed
+        max_request_bytes = app.config['MAX_UPLOAD_BYTES'] + app.config['MAX_FORM_TEXT_BYTES']
+        if request.content_length is not None and request.content_length > max_request_bytes:
+            flash('Upload too large.')
+            return redirect(url_for('user_dashboard'))
+
+        title = strip_markers(request.form['title'])
+        text = strip_markers(request.form['text'])
         
         image_path = None
         # Image Upload Handling
         if 'article_image' in request.files:
             file = request.files['article_image']
             if file.filename != '' and allowed_file(file.filename):
-                # Secure filename and save to server
-                filename = secure_filename(file.filename)
-                
-                # Prepend timestamp to filename to prevent collisions
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                unique_filename = f"{timestamp}_{filename}"
-                
-                file_path_full = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                
-                # Ensure the upload directory exists before saving
-                os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                file.save(file_path_full)
+                extension = file.filename.rsplit('.', 1)[1].lower()
+                # Stored under its content hash, so re-uploads of the same image share one file
+                try:
+                    stored_name = store_upload(file.stream, app.config['UPLOAD_FOLDER'], extension,
+                                               app.config['MAX_UPLOAD_BYTES'])
+                except UploadTooLarge:
+                    flash(f"Image too large (max {app.config['MAX_UPLOAD_BYTES'] // (1024 * 1024)} MB).")
+                    return redirect(url_for('user_dashboard'))
                 
                 # Store the web-accessible URL in the database
-                image_path = url_for('static', filename=f'uploads/{unique_filename}')
+                image_path = url_for('static', filename=f'uploads/{stored_name}')
+                # Thumbnails are made off the request path; pages show the original until then
+                get_image_tasks().enqueue(make_derivatives, os.path.join(app.config['UPLOAD_FOLDER'], stored_name),
+                                          app.config['UPLOAD_FOLDER'])
 
-        conn = sqlite3.connect('fake_news_detection.db')
+        conn = get_db()
         c = conn.cursor()
-        
+
+        if app.config['ASYNC_CLASSIFICATION']:
+            # Saved at once; a queue worker fills in the prediction and duplicate check
+            # Reviewers hear about it once the worker has classified it (classify_submissions)
+            c.execute('''INSERT INTO articles (title, text, submitted_by, submitted_at, status, classifying, image_path)
+                         VALUES (?, ?, ?, ?, 'pending', 1, ?)''',
+                      (title, text, session['user_id'], datetime.now().isoformat(), image_path))
+            classification_queue = get_classification_queue()
+            classification_queue.enqueue(conn, [c.lastrowid])
+            conn.commit()
+            classification_queue.notify()
+            flash('✨ Article submitted! The AI prediction will appear shortly.')
+            return redirect(url_for('user_dashboard'))
+
+        prediction, confidence, set_id = classify_cached([(title, text)])[0]
+
         # Insert with image_path
-        c.execute('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction, ml_confidence, status, reliable_source_json, image_path) 
+        submitted_at = datetime.now().isoformat()
+        c.execute('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction, ml_confidence, status, source_set_id, image_path) 
                      VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)''',
-                   (title, text, session['user_id'], datetime.now().isoformat(), prediction, confidence, sources_json, image_path))
+                   (title, text, session['user_id'], submitted_at, prediction, confidence, set_id, image_path))
+        article_id = c.lastrowid
+        flag_near_duplicate(conn, article_id, minhash_signature(text))
         conn.commit()
-        conn.close()
+        publish_queue_event(conn, 'submitted', {'count': 1, 'articles': [
+            {'id': article_id, 'title': title, 'submitted_at': submitted_at,
+             'ml_prediction': prediction, 'ml_confidence': confidence}]})
         
         flash(f'✨ Article submitted! AI predicts: {prediction} ({confidence*100:.1f}% confidence)')
         return redirect(url_for('user_dashboard'))
 
-    conn = sqlite3.connect('fake_news_detection.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
+    c = get_db().cursor()
     c.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],))
     user = c.fetchone()
-    c.execute('SELECT * FROM articles WHERE submitted_by = ? ORDER BY submitted_at DESC', (session['user_id'],))
-    articles = c.fetchall()
-    conn.close()
+    articles, next_cursor = fetch_page(c, DASHBOARD_QUERIES['user_articles'], (session['user_id'],),
+                                       parse_cursor(request.args.get('before')), 'submitted_at')
 
-    total_submitted = len(articles)
-    reviewed_articles = [a for a in articles if a['status'] != 'pending']
-    total_reviewed = len(reviewed_articles)
-
-    real_count = len([a for a in reviewed_articles if a['final_verdict'] == 'Real'])
-    fake_count = len([a for a in reviewed_articles if a['final_verdict'] == 'Fake'])
-    
-    ai_correct = len([a for a in reviewed_articles if a['ml_prediction'] == a['final_verdict']])
-    accuracy_rate = (ai_correct / total_reviewed * 100) if total_reviewed > 0 else 0
+    stats = user_stats(get_db(), session['user_id'])
     
-    stats = {
-        'total': total_submitted,
-        'reviewed': total_reviewed,
-        'pending': total_submitted - total_reviewed,
-        'real': real_count,
-        'fake': fake_count,
-        'accuracy': accuracy_rate
+    # Shared source lists, cached in memory once loaded
+    source_lists = source_sets.lookup(get_db(), (article['source_set_id'] for article in articles))
+
+    return render_template('user_dashboard.html', user=user, articles_with_sources=articles, source_lists=source_lists,
+                           stats=stats, next_cursor=next_cursor)
+
+
+@app.route('/articles/<int:article_id>/text')
+def article_text(article_id):
+    """Full article body, loaded lazily by the dashboard lists."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'unauthorized'}), 401
+
+    article = get_db().execute('SELECT submitted_by, text FROM articles WHERE id = ?', (article_id,)).fetchone()
+    # Regular users may only read their own submissions
+    if article is None or (session.get('user_role') == 'user' and article['submitted_by'] != session['user_id']):
+        return jsonify({'error': 'not found'}), 404
+    return jsonify({'text': article['text']})
+
+@app.route('/articles/bulk', methods=['POST'])
+def bulk_ingest():
+    """Bulk import of a JSONL or CSV file with 'title' and 'text' fields."""
+    if 'user_id' not in session or session.get('user_role') not in ('user', 'admin'):
+        return jsonify({'error': 'unauthorized'}), 401
+
+    file = request.files.get('articles_file')
+    if file is None or file.filename == '':
+        return jsonify({'error': 'articles_file is required'}), 400
+
+    fmt = request.form.get('format') or ('csv' if file.filename.lower().endswith('.csv') else 'jsonl')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    try:
+        inserted, skipped = ingest_articles(iter_article_records(stream, fmt), session['user_id'])
+        error = None
+    except IngestError as failure:
+        inserted, skipped, error = failure.inserted, failure.skipped, str(failure)
+    if inserted:
+        publish_queue_event(get_db(), 'submitted', {'count': inserted, 'articles': []})
+    if error is not None:
+        return jsonify({'error': error, 'inserted': inserted, 'skipped': skipped}), 400
+    return jsonify({'inserted': inserted, 'skipped': skipped})
+
+
+def claim_articles(conn, reviewer_id):
+    """Lease pending articles to a reviewer so no two reviewers work on the same one.
+
+    The reviewer's live claims are renewed and topped up to REVIEW_BATCH_SIZE with the
+    oldest unclaimed articles, including any whose lease has run out. Articles the reviewer
+    returned or let lapse go to other reviewers for one lease period first. Both happen in one
+    IMMEDIATE transaction, so concurrent reviewers always receive disjoint batches, and
+    the oldest-first scan stops after batch + leased rows instead of reading the queue.
+    Articles still being classified are left until their prediction is in.
+    """
+    now = datetime.now()
+    now_text = now.isoformat()
+    lease = timedelta(seconds=app.config['REVIEW_LEASE_SECONDS'])
+    expires_at = (now + lease).isoformat()
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        held = conn.execute('''UPDATE articles SET claim_expires_at = ?
+                               WHERE claimed_by = ? AND status = 'pending' AND claim_expires_at >= ?
+                               RETURNING id''', (expires_at, reviewer_id, now_text)).fetchall()
+        wanted = app.config['REVIEW_BATCH_SIZE'] - len(held)
+        if wanted > 0:
+            conn.execute('''UPDATE articles SET claimed_by = ?, claim_expires_at = ?
+                            WHERE id IN (SELECT id FROM articles
+                                         WHERE status = 'pending' AND classifying = 0
+                                           AND (claim_expires_at IS NULL OR claim_expires_at < ?)
+                                           AND (claimed_by IS NOT ? OR claim_expires_at < ?)
+                                         ORDER BY submitted_at, id LIMIT ?)''',
+                         (reviewer_id, expires_at, now_text, reviewer_id, (now - lease).isoformat(), wanted))
+
+VERDICTS = ('Real', 'Fake')
+VERDICT_CHUNK = 500 # (article_id, verdict) pairs per UPDATE, well under SQLite's bound-parameter limit
+
+def batch_verdicts(form, default_field):
+    """(article_id, verdict) pairs from a multi-select form.
+
+    Each checked article_ids value takes the form-wide verdict, or its own verdict_<id>
+    field when that is left blank. Returns None if any id or verdict is invalid.
+    """
+    pairs = []
+    for value in form.getlist('article_ids'):
+        if not value.isdigit():
+            return None
+        verdict = form.get(default_field) or form.get(f'verdict_{value}')
+        if verdict not in VERDICTS:
+            return None
+        pairs.append((int(value), verdict))
+    return pairs
+
+def verdict_values(chunk):
+    """A VALUES table of (article_id, verdict) rows to join into an UPDATE, and its parameters."""
+    return ', '.join(['(?, ?)'] * len(chunk)), [value for pair in chunk for value in pair]
+
+def apply_reviews(conn, reviewer_id, verdicts, needs_admin_review=0):
+    """Record (article_id, verdict) reviews in one transaction.
+
+    The pairs are joined into the UPDATE as a VALUES table, so each VERDICT_CHUNK of them
+    is a single statement, and RETURNING reports exactly the rows it changed. Articles that
+    were reviewed, or claimed by another reviewer, in the meantime are skipped. Returns the
+    ids of the articles actually reviewed.
+    """
+    now = datetime.now().isoformat()
+    applied = []
+    with conn:
+        for start in range(0, len(verdicts), VERDICT_CHUNK):
+            values, params = verdict_values(verdicts[start:start + VERDICT_CHUNK])
+            applied += [row[0] for row in conn.execute(
+                f'''UPDATE articles SET status = 'reviewed', final_verdict = v.column2,
+                                       reviewed_by = ?, reviewed_at = ?, needs_admin_review = ?,
+                                       claimed_by = NULL, claim_expires_at = NULL
+                    FROM (VALUES {values}) AS v
+                    WHERE articles.id = v.column1 AND articles.status = 'pending'
+                      AND (articles.claimed_by = ? OR articles.claimed_by IS NULL OR articles.claim_expires_at < ?)
+                    RETURNING articles.id''',
+                (reviewer_id, now, needs_admin_review, *params, reviewer_id, now))]
+    return applied
+
+def apply_admin_verdicts(conn, admin_id, verdicts):
+    """Finalize (article_id, verdict) pairs as admin verdicts in one transaction, like apply_reviews.
+
+    Articles that are still pending or were already finalized are skipped. Returns the
+    ids of the articles actually finalized.
+    """
+    now = datetime.now().isoformat()
+    applied = []
+    with conn:
+        for start in range(0, len(verdicts), VERDICT_CHUNK):
+            values, params = verdict_values(verdicts[start:start + VERDICT_CHUNK])
+            applied += [row[0] for row in conn.execute(
+                f'''UPDATE articles SET admin_verified = 1, final_verdict = v.column2, status = 'admin_reviewed',
+                                       admin_verified_by = ?, admin_verified_at = ?, needs_admin_review = 0
+                    FROM (VALUES {values}) AS v
+                    WHERE articles.id = v.column1 AND articles.status != 'pending' AND articles.admin_verified = 0
+                    RETURNING articles.id''',
+                (admin_id, now, *params))]
+    return applied
+
+def reviewer_stats(conn, reviewer_id):
+    """(stats, verdict counts, ML prediction counts) for a reviewer, from the trigger-maintained counters."""
+    system_counters = get_counters(conn, 'all')
+    reviewer_counters = get_counters(conn, 'reviewer', reviewer_id)
+
+    total_reviewed = reviewer_counters['total']
+    reviewer_accuracy_rate = (reviewer_counters['ai_correct'] / total_reviewed * 100) if total_reviewed > 0 else 0
+
+    reviewer_verdict_counts = {'Real': reviewer_counters['verdict_real'], 'Fake': reviewer_counters['verdict_fake']}
+
+    # Pending queue plus everything this reviewer has reviewed
+    ml_prediction_counts = {
+        'Real': system_counters['pending_ml_real'] + reviewer_counters['ml_real'],
+        'Fake': system_counters['pending_ml_fake'] + reviewer_counters['ml_fake'],
     }
-    
-    articles_with_sources = []
-    for article in articles:
-        a = dict(article)
-        try:
-            a['parsed_sources'] = json.loads(a['reliable_source_json'])
-        except:
-            a['parsed_sources'] = []
-        articles_with_sources.append(a)
-
-    # HTML for User Dashboard (Form now includes enctype="multipart/form-data")
-    html = BASE_HTML.replace('{% block content %}{% endblock %}', '''
-    <div class="navbar">
-        <h1>User Dashboard</h1>
-        <div class="user-info">
-            <span>👤 {{ user.name }}</span>
-            <a href="{{ url_for('logout') }}" class="btn btn-danger">Logout</a>
-        </div>
-    </div>
-    <div class="container">
-        {% with messages = get_flashed_messages() %}{% if messages %}{% for message in messages %}<div class="alert alert-success">{{ message }}</div>{% endfor %}{% endif %}{% endwith %}
-
-        <div class="grid" style="margin-bottom:30px;">
-            <div class="stat-card">
-                <h3>Total Submitted</h3>
-                <div class="number">{{ stats.total }}</div>
-                <small>Articles you submitted</small>
-            </div>
-            <div class="stat-card">
-                <h3>Reviewed</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--success),#059669);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ stats.reviewed }}</div>
-                <small>Verification complete</small>
-            </div>
-            <div class="stat-card">
-                <h3>Pending</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--warning),#d97706);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ stats.pending }}</div>
-                <small>Awaiting review</small>
-            </div>
-        </div>
-
-        {% if stats.reviewed > 0 %}
-        <div class="card">
-            <h2>📊 Your Submission Analytics</h2>
-            <div class="grid">
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Verification Results</h3>
-                    <div class="chart-container">
-                        <canvas id="userPieChart"></canvas>
-                    </div>
-                    <div style="text-align:center;margin-top:15px;">
-                        <span class="badge badge-real">{{ stats.real }} Real</span>
-                        <span class="badge badge-fake">{{ stats.fake }} Fake</span>
-                    </div>
-                </div>
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">AI Accuracy on Your Articles</h3>
-                    <div class="chart-container">
-                        <canvas id="userAccuracyChart"></canvas>
-                    </div>
-                    <div style="text-align:center;margin-top:15px;font-size:32px;font-weight:800;color:var(--primary);">
-                        {{ "%.1f"|format(stats.accuracy) }}%
-                    </div>
-                    <p style="text-align:center;color:var(--gray-600);font-size:13px;">AI correctly predicted your articles</p>
-                </div>
-            </div>
-        </div>
-        {% endif %}
-
-        <div class="grid">
-            <div class="card">
-                <h2>📝 Submit Article (with Image Upload)</h2>
-                <form method="POST" enctype="multipart/form-data">
-                    <div class="form-group">
-                        <label>Article Title</label>
-                        <input type="text" name="title" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Article Text</label>
-                        <textarea name="text" rows="8" required></textarea>
-                    </div>
-                    <div class="form-group">
-                        <label>🖼️ Upload Header Image (Optional)</label>
-                        <input type="file" name="article_image" accept="image/*">
-                    </div>
-                    <button type="submit" class="btn" style="width:100%;justify-content:center;">🔍 Analyze</button>
-                </form>
-            </div>
-            <div class="card">
-                <h2>📋 My Submissions ({{ stats.total }})</h2>
-                <div style="max-height:500px;overflow-y:auto;">
-                    {% if articles_with_sources %}
-                        {% for article in articles_with_sources %}
-                            <div class="article-item">
-                                <h3>{{ article.title }}</h3>
-                                {% if article.image_path %}
-                                    <img src="{{ article.image_path }}" class="article-image" alt="Article Image">
-                                {% endif %}
-                                <div style="margin:10px 0;">
-                                    <span class="badge {% if article.ml_prediction == 'Fake' %}badge-fake{% else %}badge-real{% endif %}">
-                                        🤖 ML: {{ article.ml_prediction }} ({{ "%.0f"|format(article.ml_confidence * 100) }}%)
-                                    </span>
-                                </div>
-                                {% if article.status == 'pending' %}
-                                    <span class="badge badge-pending">⏳ Pending</span>
-                                {% else %}
-                                    <span class="badge {% if article.final_verdict == 'Fake' %}badge-fake{% else %}badge-real{% endif %}">
-                                        ✅ {{ article.final_verdict }} (Reviewed)
-                                    </span>
-                                    <div class="sources-box">
-                                        <strong>📚 Reliable Sources:</strong>
-                                        <ul>
-                                            {% for source in article.parsed_sources %}
-                                                <li><a href="{{ source.uri }}" target="_blank">{{ source.title }}</a></li>
-                                            {% endfor %}
-                                        </ul>
-                                    </div>
-                                {% endif %}
-                            </div>
-                        {% endfor %}
-                    {% else %}
-                        <p style="color:var(--gray-600); text-align:center; padding:20px;">No articles submitted yet.</p>
-                    {% endif %}
-                </div>
-            </div>
-        </div>
-    </div>
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {
-            var userPieCtx = document.getElementById('userPieChart');
-            var userAccuracyCtx = document.getElementById('userAccuracyChart');
-
-            if (userPieCtx && userAccuracyCtx) {
-                // User Verdict Chart (Pie)
-                new Chart(userPieCtx, {
-                    type: 'pie',
-                    data: {
-                        labels: ['Real', 'Fake'],
-                        datasets: [{
-                            data: [{{ stats.real }}, {{ stats.fake }}],
-                            backgroundColor: ['#10B981', '#EF4444'],
-                            hoverOffset: 4
-                        }]
-                    },
-                    options: { responsive: true, maintainAspectRatio: false, plugins: { legend: { position: 'bottom' } } }
-                });
-
-                // User Accuracy Chart (Gauge)
-                new Chart(userAccuracyCtx, {
-                    type: 'doughnut',
-                    data: {
-                        labels: ['Correct', 'Incorrect'],
-                        datasets: [{
-                            data: [{{ stats.accuracy | int }}, {{ 100 - (stats.accuracy | int) }}],
-                            backgroundColor: ['#2563EB', '#E5E7EB'],
-                            borderWidth: 0
-                        }]
-                    },
-                    options: {
-                        responsive: true, maintainAspectRatio: false, cutout: '80%',
-                        plugins: { legend: { display: false }, tooltip: { enabled: false } },
-                        rotation: -90, circumference: 180, 
-                    }
-                });
-            }
-        });
-    </script>
-    ''')
-    return render_template_string(html, user=user, articles_with_sources=articles_with_sources, stats=stats)
 
+    stats = {
+        'total_pending': system_counters['pending'],
+        'total_reviewed_by_reviewer': total_reviewed,
+        'marked_for_admin_review': reviewer_counters['needs_admin_review'],
+        'reviewer_accuracy': reviewer_accuracy_rate
+    }
+    return stats, reviewer_verdict_counts, ml_prediction_counts
 
 @app.route('/reviewer/dashboard', methods=['GET', 'POST'])
 def reviewer_dashboard():
     if 'user_id' not in session or session.get('user_role') != 'reviewer':
         return redirect(url_for('login'))
 
-    conn = sqlite3.connect('fake_news_detection.db')
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     c = conn.cursor()
 
     if request.method == 'POST':
@@ -581,257 +790,67 @@ def reviewer_dashboard():
             final_verdict = request.form['final_verdict']
             needs_admin_review = 1 if request.form.get('needs_admin_review') == 'on' else 0 
             
-            c.execute('''UPDATE articles SET status = 'reviewed', final_verdict = ?,
-                         reviewed_by = ?, reviewed_at = ?, needs_admin_review = ?
-                         WHERE id = ?''',
-                      (final_verdict, session['user_id'], datetime.now().isoformat(), needs_admin_review, article_id))
-            flash('Article reviewed successfully!')
+            applied = apply_reviews(conn, session['user_id'], [(article_id, final_verdict)], needs_admin_review)
+            if applied:
+                flash('Article reviewed successfully!')
+                publish_queue_event(conn, 'reviewed', {'ids': applied})
+            else:
+                flash('This article was already reviewed or is claimed by another reviewer.')
+        elif action == 'batch_review':
+            verdicts = batch_verdicts(request.form, 'batch_verdict')
+            if not verdicts:
+                flash('Select at least one article and a verdict.')
+            else:
+                needs_admin_review = 1 if request.form.get('needs_admin_review') == 'on' else 0
+                applied = apply_reviews(conn, session['user_id'], verdicts, needs_admin_review)
+                skipped = len(verdicts) - len(applied)
+                flash(f'Reviewed {len(applied)} articles.' + (f' {skipped} were already reviewed or claimed by another reviewer.' if skipped else ''))
+                if applied:
+                    publish_queue_event(conn, 'reviewed', {'ids': applied})
+        elif action == 'release':
+            # Ends the lease now; claim_articles then offers it to the other reviewers first
+            c.execute('''UPDATE articles SET claim_expires_at = ?
+                         WHERE id = ? AND claimed_by = ? AND status = 'pending' ''',
+                      (datetime.now().isoformat(), article_id, session['user_id']))
+            if c.rowcount:
+                conn.commit()
+                publish_queue_event(conn, 'released', {'ids': [int(article_id)]})
+            flash('Article returned to the queue for other reviewers.')
         elif action == 'dismiss_admin_review': 
             c.execute('''UPDATE articles SET needs_admin_review = 0 WHERE id = ? AND reviewed_by = ?''',
                       (article_id, session['user_id']))
             flash('Admin review request dismissed.')
         
         conn.commit()
-        conn.close()
         return redirect(url_for('reviewer_dashboard'))
 
     c.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],))
     reviewer = c.fetchone()
 
-    c.execute('''SELECT a.*, u.name as submitted_by_name FROM articles a
-                 JOIN users u ON a.submitted_by = u.id
-                 WHERE a.status = 'pending' ORDER BY a.submitted_at DESC''')
-    pending_articles = c.fetchall()
+    claim_articles(conn, session['user_id'])
+    pending_articles = c.execute(DASHBOARD_QUERIES['claimed_articles'],
+                                 (session['user_id'], datetime.now().isoformat())).fetchall()
 
-    c.execute('''SELECT a.*, u.name as submitted_by_name FROM articles a
-                 JOIN users u ON a.submitted_by = u.id
-                 WHERE a.reviewed_by = ? ORDER BY a.reviewed_at DESC''', (session['user_id'],))
-    reviewed_articles_by_reviewer = c.fetchall()
+    reviewed_articles_by_reviewer, reviewed_next = fetch_page(c, DASHBOARD_QUERIES['reviewer_articles'], (session['user_id'],),
+                                                              parse_cursor(request.args.get('reviewed_before')), 'reviewed_at')
 
-    total_reviewed = len(reviewed_articles_by_reviewer)
-    marked_for_admin_review = len([a for a in reviewed_articles_by_reviewer if a['needs_admin_review'] == 1 and a['admin_verified'] == 0])
+    stats, reviewer_verdict_counts, ml_prediction_counts = reviewer_stats(conn, session['user_id'])
     
-    reviewer_ai_correct = len([a for a in reviewed_articles_by_reviewer if a['ml_prediction'] == a['final_verdict']])
-    reviewer_accuracy_rate = (reviewer_ai_correct / total_reviewed * 100) if total_reviewed > 0 else 0
-
-    reviewer_verdict_counts = {'Real': 0, 'Fake': 0}
-    for article in reviewed_articles_by_reviewer:
-        if article['final_verdict'] in reviewer_verdict_counts:
-            reviewer_verdict_counts[article['final_verdict']] += 1
-
-    ml_prediction_counts = {'Real': 0, 'Fake': 0}
-    for article in pending_articles + reviewed_articles_by_reviewer:
-        if article['ml_prediction'] in ml_prediction_counts:
-            ml_prediction_counts[article['ml_prediction']] += 1
-            
-    conn.close()
+    source_lists = source_sets.lookup(conn, (article['source_set_id'] for article in pending_articles))
 
-    stats = {
-        'total_pending': len(pending_articles),
-        'total_reviewed_by_reviewer': total_reviewed,
-        'marked_for_admin_review': marked_for_admin_review,
-        'reviewer_accuracy': reviewer_accuracy_rate
-    }
-    
-    pending_articles_with_sources = []
-    for article in pending_articles:
-        a = dict(article)
-        try: a['parsed_sources'] = json.loads(a['reliable_source_json'])
-        except: a['parsed_sources'] = []
-        pending_articles_with_sources.append(a)
-
-    reviewed_by_reviewer_with_sources = []
-    for article in reviewed_articles_by_reviewer:
-        a = dict(article)
-        try: a['parsed_sources'] = json.loads(a['reliable_source_json'])
-        except: a['parsed_sources'] = []
-        reviewed_by_reviewer_with_sources.append(a)
-
-    # HTML for Reviewer Dashboard (Display uploaded image if available)
-    html = BASE_HTML.replace('{% block content %}{% endblock %}', '''
-    <div class="navbar">
-        <h1>Reviewer Dashboard</h1>
-        <div class="user-info">
-            <span>🕵️‍♀️ {{ reviewer.name }}</span>
-            <a href="{{ url_for('logout') }}" class="btn btn-danger">Logout</a>
-        </div>
-    </div>
-    <div class="container">
-        {% with messages = get_flashed_messages() %}{% if messages %}{% for message in messages %}<div class="alert alert-success">{{ message }}</div>{% endfor %}{% endif %}{% endwith %}
-
-        <div class="grid" style="margin-bottom:30px;">
-            <div class="stat-card">
-                <h3>Pending Articles</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--warning),#d97706);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ stats.total_pending }}</div>
-                <small>Awaiting your review</small>
-            </div>
-            <div class="stat-card">
-                <h3>Total Reviewed</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--success),#059669);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ stats.total_reviewed_by_reviewer }}</div>
-                <small>Articles you have verified</small>
-            </div>
-            <div class="stat-card">
-                <h3>For Admin Review</h3>
-                <div class="number" style="background:linear-gradient(135deg,#60a5fa,#3b82f6);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ stats.marked_for_admin_review }}</div>
-                <small>Flagged for admin verification</small>
-            </div>
-        </div>
+    reviewed_by_reviewer_with_sources = [dict(article) for article in reviewed_articles_by_reviewer]
 
-        
-        <div class="card">
-            <h2>📊 Reviewer Analytics</h2>
-            <div class="grid">
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Your Verdicts Distribution (Real vs. Fake)</h3>
-                    <div class="chart-container">
-                        <canvas id="reviewerVerdictChart"></canvas>
-                    </div>
-                    <div style="text-align:center;margin-top:15px;">
-                        <span class="badge badge-real">{{ reviewer_verdict_counts.Real }} Real</span>
-                        <span class="badge badge-fake">{{ reviewer_verdict_counts.Fake }} Fake</span>
-                    </div>
-                </div>
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Overall ML Prediction on All Articles Seen</h3>
-                    <div class="chart-container">
-                        <canvas id="reviewerMLPredictionChart"></canvas>
-                    </div>
-                    <div style="text-align:center;margin-top:15px;">
-                        <span class="badge badge-real" style="background:linear-gradient(135deg, #dbeafe, #93c5fd); color:#1e40af; border:2px solid #3b82f6;">{{ ml_prediction_counts.Real }} ML Real</span>
-                        <span class="badge badge-fake" style="background:linear-gradient(135deg, #fef3c7, #fde68a); color:#92400e; border:2px solid #f59e0b;">{{ ml_prediction_counts.Fake }} ML Fake</span>
-                    </div>
-                </div>
-            </div>
-            <div class="feature-highlight">
-                ✨ The AI accuracy (ML vs. Your Verdicts) is <b>{{ "%.1f"|format(stats.reviewer_accuracy) }}%</b>.
-            </div>
-        </div>
-
-        <div class="card">
-            <h2>⏳ Articles Pending Your Review ({{ stats.total_pending }})</h2>
-            {% if pending_articles_with_sources %}
-                {% for article in pending_articles_with_sources %}
-                    <div class="article-item" style="border-color:var(--warning);">
-                        <h3>{{ article.title }} <span style="font-size:12px;color:var(--gray-600);">by {{ article.submitted_by_name }} on {{ article.submitted_at.split('T')[0] }}</span></h3>
-                        {% if article.image_path %}
-                            <img src="{{ url_for('static', filename='uploads/' ~ article.image_path.split('/')[-1]) }}" class="article-image" alt="Article Image">
-                        {% endif %}
-                        <p style="color:var(--gray-700); font-size:14px; margin-top:10px;">{{ article.text[:200] }}...</p>
-                        <div style="margin:10px 0;">
-                            <span class="badge {% if article.ml_prediction == 'Fake' %}badge-fake{% else %}badge-real{% endif %}">
-                                🤖 ML Prediction: {{ article.ml_prediction }} ({{ "%.0f"|format(article.ml_confidence * 100) }}%)
-                            </span>
-                        </div>
-                        <div class="sources-box">
-                            <strong>📚 Reliable Sources Found:</strong>
-                            <ul>
-                                {% for source in article.parsed_sources %}
-                                    <li><a href="{{ source.uri }}" target="_blank">{{ source.title }}</a></li>
-                                {% endfor %}
-                            </ul>
-                        </div>
-                        <form method="POST" style="margin-top:20px;">
-                            <input type="hidden" name="article_id" value="{{ article.id }}">
-                            <input type="hidden" name="action" value="review">
-                            <div class="form-group">
-                                <label>Final Verdict</label>
-                                <select name="final_verdict">
-                                    <option value="Real">Real News (Verified)</option>
-                                    <option value="Fake">Fake News (Misinformation)</option>
-                                </select>
-                            </div>
-                            <div class="form-group" style="display:flex; align-items:center; gap:10px;">
-                                <input type="checkbox" name="needs_admin_review" id="admin_review_{{ article.id }}" style="width:20px; height:20px;">
-                                <label for="admin_review_{{ article.id }}" style="margin-bottom:0; font-weight:500;">Flag for Admin Review (High Importance/Controversy)</label>
-                            </div>
-                            <button type="submit" class="btn btn-success" style="width:100%;justify-content:center;">Submit Verification</button>
-                        </form>
-                    </div>
-                {% endfor %}
-            {% else %}
-                <p style="color:var(--gray-600); text-align:center; padding:20px;">🎉 No articles are currently pending your review.</p>
-            {% endif %}
-        </div>
-        
-        <div class="card">
-            <h2>✅ My Reviewed Articles ({{ stats.total_reviewed_by_reviewer }})</h2>
-            {% if reviewed_by_reviewer_with_sources %}
-                {% for article in reviewed_by_reviewer_with_sources %}
-                    <div class="article-item" style="border-color:{% if article.needs_admin_review and article.admin_verified == 0 %}#3b82f6{% elif article.final_verdict == 'Fake' %}var(--danger){% else %}var(--success){% endif %};">
-                        <div style="display:flex; justify-content:space-between; align-items:center;">
-                            <h3>{{ article.title }}</h3>
-                            {% if article.admin_verified == 1 %}
-                                <span class="badge" style="background:linear-gradient(135deg,#dbeafe,#93c5fd); color:#1e40af; border:2px solid #3b82f6;">
-                                    👑 Admin Finalized: {{ article.final_verdict }}
-                                </span>
-                            {% elif article.needs_admin_review == 1 %}
-                                <span class="badge" style="background:linear-gradient(135deg,#fef3c7,#fde68a); color:#92400e; border:2px solid #f59e0b;">
-                                    🚨 Admin Check Requested
-                                </span>
-                            {% else %}
-                                <span class="badge {% if article.final_verdict == 'Fake' %}badge-fake{% else %}badge-real{% endif %}">
-                                    ✅ Final Verdict: {{ article.final_verdict }}
-                                </span>
-                            {% endif %}
-                        </div>
-                        <p style="font-size:12px; color:var(--gray-600); margin-top:5px;">Reviewed on {{ article.reviewed_at.split('T')[0] }}</p>
-                        {% if article.needs_admin_review and article.admin_verified == 0 %}
-                            <form method="POST" style="margin-top:10px;">
-                                <input type="hidden" name="article_id" value="{{ article.id }}">
-                                <input type="hidden" name="action" value="dismiss_admin_review">
-                                <button type="submit" class="btn" style="background:var(--gray-600); padding:8px 15px; font-size:12px; border-radius:8px; box-shadow:none;">Dismiss Admin Review Request</button>
-                            </form>
-                        {% endif %}
-                    </div>
-                {% endfor %}
-            {% else %}
-                <p style="color:var(--gray-600); text-align:center; padding:20px;">Start reviewing articles to see them here.</p>
-            {% endif %}
-        </div>
-    </div>
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {
-            // Reviewer Verdict Chart (Pie)
-            new Chart(document.getElementById('reviewerVerdictChart'), {
-                type: 'pie',
-                data: {
-                    labels: ['Real News', 'Fake News'],
-                    datasets: [{
-                        data: [{{ reviewer_verdict_counts.Real }}, {{ reviewer_verdict_counts.Fake }}],
-                        backgroundColor: ['#10B981', '#EF4444'],
-                        hoverOffset: 4
-                    }]
-                },
-                options: { responsive: true, maintainAspectRatio: false, plugins: { legend: { position: 'bottom' } } }
-            });
-
-            // Reviewer ML Prediction Chart (Doughnut)
-            new Chart(document.getElementById('reviewerMLPredictionChart'), {
-                type: 'doughnut',
-                data: {
-                    labels: ['ML Real', 'ML Fake'],
-                    datasets: [{
-                        data: [{{ ml_prediction_counts.Real }}, {{ ml_prediction_counts.Fake }}],
-                        backgroundColor: ['#3B82F6', '#F59E0B'],
-                        hoverOffset: 4
-                    }]
-                },
-                options: { responsive: true, maintainAspectRatio: false, cutout: '70%', plugins: { legend: { position: 'bottom' } } }
-            });
-        });
-    </script>
-    ''')
-    return render_template_string(html, reviewer=reviewer, pending_articles_with_sources=pending_articles_with_sources, 
-                                  reviewed_by_reviewer_with_sources=reviewed_by_reviewer_with_sources, stats=stats, 
-                                  reviewer_verdict_counts=reviewer_verdict_counts, ml_prediction_counts=ml_prediction_counts)
+    return render_template('reviewer_dashboard.html', reviewer=reviewer, pending_articles_with_sources=pending_articles,
+                           source_lists=source_lists, reviewed_by_reviewer_with_sources=reviewed_by_reviewer_with_sources, stats=stats, 
+                           reviewer_verdict_counts=reviewer_verdict_counts, ml_prediction_counts=ml_prediction_counts,
+                           reviewed_next=reviewed_next)
 
 @app.route('/admin/dashboard', methods=['GET', 'POST'])
 def admin_dashboard():
     if 'user_id' not in session or session.get('user_role') != 'admin':
         return redirect(url_for('login'))
 
-    conn = sqlite3.connect('fake_news_detection.db')
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     c = conn.cursor()
 
     if request.method == 'POST':
@@ -841,83 +860,57 @@ def admin_dashboard():
         if action == 'admin_verify':
             admin_verdict = request.form['admin_verdict']
             
-            c.execute('''UPDATE articles SET admin_verified = 1, final_verdict = ?, status = 'admin_reviewed',
-                         admin_verified_by = ?, admin_verified_at = ?, needs_admin_review = 0
-                         WHERE id = ?''',
-                      (admin_verdict, session['user_id'], datetime.now().isoformat(), article_id))
-            flash('Article administratively verified successfully!')
+            applied = apply_admin_verdicts(conn, session['user_id'], [(article_id, admin_verdict)])
+            if applied:
+                publish_queue_event(conn, 'verified', {'ids': applied})
+                flash('Article administratively verified successfully!')
+            else:
+                flash('This article is not awaiting an admin verdict.')
+        elif action == 'batch_admin_verify':
+            verdicts = batch_verdicts(request.form, 'batch_verdict')
+            if not verdicts:
+                flash('Select at least one article and a verdict.')
+            else:
+                applied = apply_admin_verdicts(conn, session['user_id'], verdicts)
+                if applied:
+                    publish_queue_event(conn, 'verified', {'ids': applied})
+                skipped = len(verdicts) - len(applied)
+                flash(f'Administratively verified {len(applied)} articles.' + (f' {skipped} were not awaiting an admin verdict.' if skipped else ''))
         
         conn.commit()
-        conn.close()
         return redirect(url_for('admin_dashboard'))
 
     # --- Fetch Data for Analytics and Display ---
-    
-    c.execute('SELECT * FROM users WHERE role = "reviewer"')
-    reviewers = c.fetchall()
-    
-    c.execute('SELECT * FROM articles')
-    all_articles = c.fetchall()
-    
-    c.execute('SELECT COUNT(*) FROM users')
-    total_users = c.fetchone()[0]
-    conn.close()
-
-    # 1. Status Distribution 
-    total_articles = len(all_articles)
-    pending_count = len([a for a in all_articles if a['status'] == 'pending'])
-    reviewed_count = len([a for a in all_articles if a['status'] == 'reviewed'])
-    admin_reviewed_count = len([a for a in all_articles if a['status'] == 'admin_reviewed'])
-    needs_admin_review_count = len([a for a in all_articles if a['needs_admin_review'] == 1 and a['admin_verified'] == 0])
-    
-    # 2. ML Prediction & Final Verdict Distribution
-    ml_prediction_counts = {'Real': 0, 'Fake': 0}
-    final_verdict_counts = {'Real': 0, 'Fake': 0}
-    
-    reviewed_articles = [a for a in all_articles if a['status'] != 'pending']
-    
-    for article in all_articles:
-        if article['ml_prediction'] in ml_prediction_counts:
-            ml_prediction_counts[article['ml_prediction']] += 1
-
-    for article in reviewed_articles:
-        if article['final_verdict'] in final_verdict_counts:
-            final_verdict_counts[article['final_verdict']] += 1
-            
+    # Counts come from the trigger-maintained article_counters table, not the articles rows.
+
+    # 1-3. Status, ML prediction and final verdict distributions plus ML accuracy
+    counts = get_counters(conn, 'all')
+    total_articles = counts['total']
+    pending_count = counts['pending']
+    reviewed_count = counts['reviewed']
+    admin_reviewed_count = counts['admin_reviewed']
+    needs_admin_review_count = counts['needs_admin_review']
+
+    ml_prediction_counts = {'Real': counts['ml_real'], 'Fake': counts['ml_fake']}
+    final_verdict_counts = {'Real': counts['verdict_real'], 'Fake': counts['verdict_fake']}
     total_final_verdicts = sum(final_verdict_counts.values())
-    
-    # 3. ML Accuracy (vs. Final Human Verdict)
-    ai_correct_count = len([a for a in reviewed_articles if a['ml_prediction'] == a['final_verdict']])
-    ml_accuracy_rate = (ai_correct_count / total_final_verdicts * 100) if total_final_verdicts > 0 else 0
+    ml_accuracy_rate = (counts['ai_correct'] / total_final_verdicts * 100) if total_final_verdicts > 0 else 0
 
     # 4. Reviewer Activity
-    reviewer_activity = {}
-    for reviewer in reviewers:
-        reviewer_id = reviewer['id']
-        reviewed_count_by_reviewer = len([a for a in reviewed_articles if a['reviewed_by'] == reviewer_id]) 
-        reviewer_activity[reviewer['name']] = reviewed_count_by_reviewer
+    c.execute(DASHBOARD_QUERIES['reviewer_activity'])
+    reviewer_rows = c.fetchall()
+    reviewer_activity = {row['name']: row['reviewed_count'] for row in reviewer_rows}
+
+    c.execute('SELECT COUNT(*) FROM users')
+    total_users = c.fetchone()[0]
 
     # 5. Articles Requiring Admin Review (List)
-    conn = sqlite3.connect('fake_news_detection.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('''SELECT a.*, u.name as submitted_by_name, r.name as reviewed_by_name FROM articles a
-                 JOIN users u ON a.submitted_by = u.id
-                 LEFT JOIN users r ON a.reviewed_by = r.id
-                 WHERE a.needs_admin_review = 1 AND a.admin_verified = 0 ORDER BY a.reviewed_at DESC''')
+    c.execute(DASHBOARD_QUERIES['admin_review_articles'])
     admin_review_articles = c.fetchall()
-    conn.close()
-
-    admin_review_articles_with_sources = []
-    for article in admin_review_articles:
-        a = dict(article)
-        try: a['parsed_sources'] = json.loads(a['reliable_source_json'])
-        except: a['parsed_sources'] = []
-        admin_review_articles_with_sources.append(a)
 
     admin_stats = {
         'total_users': total_users,
-        'total_reviewers': len(reviewers),
+        'total_reviewers': len(reviewer_rows),
         'total_articles': total_articles,
         'pending_review': pending_count,
         'needs_admin_review': needs_admin_review_count,
@@ -925,198 +918,407 @@ def admin_dashboard():
         'reviewed_total': total_final_verdicts
     }
 
-    # --- HTML & Visualization Setup ---
-    html = BASE_HTML.replace('{% block content %}{% endblock %}', '''
-    <div class="navbar">
-        <h1>Admin Dashboard</h1>
-        <div class="user-info">
-            <span>👑 {{ session.user_name }}</span>
-            <a href="{{ url_for('logout') }}" class="btn btn-danger">Logout</a>
-        </div>
-    </div>
-    <div class="container">
-        {% with messages = get_flashed_messages() %}{% if messages %}{% for message in messages %}<div class="alert alert-success">{{ message }}</div>{% endfor %}{% endif %}{% endwith %}
-
-        <div class="grid" style="margin-bottom:30px;">
-            <div class="stat-card">
-                <h3>Total Articles</h3>
-                <div class="number">{{ admin_stats.total_articles }}</div>
-                <small>Total submissions in the system</small>
-            </div>
-            <div class="stat-card">
-                <h3>Pending Review</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--warning),#d97706);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ admin_stats.pending_review }}</div>
-                <small>Awaiting first human review</small>
-            </div>
-            <div class="stat-card">
-                <h3>Needs Admin Check</h3>
-                <div class="number" style="background:linear-gradient(135deg,#60a5fa,#3b82f6);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ admin_stats.needs_admin_review }}</div>
-                <small>Articles flagged by Reviewers</small>
-            </div>
-            <div class="stat-card">
-                <h3>Total Users</h3>
-                <div class="number" style="background:linear-gradient(135deg,var(--secondary),#5b21b6);-webkit-background-clip:text;-webkit-text-fill-color:transparent;">{{ admin_stats.total_users }}</div>
-                <small>Registered accounts</small>
-            </div>
-        </div>
-
-        <div class="card">
-            <h2>🌍 System-Wide Analytics</h2>
-            <div class="grid" style="grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));">
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Article Status Distribution</h3>
-                    <div class="chart-container"><canvas id="adminStatusChart"></canvas></div>
-                </div>
-
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Final Human Verdicts ({{ admin_stats.reviewed_total }})</h3>
-                    <div class="chart-container"><canvas id="adminVerdictChart"></canvas></div>
-                </div>
-            </div>
-
-            <div class="grid" style="grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); margin-top:30px;">
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">ML Model Accuracy vs. Human Verdict</h3>
-                    <div class="chart-container">
-                        <canvas id="adminAccuracyChart"></canvas>
-                        <div style="text-align:center;margin-top:15px;font-size:36px;font-weight:800;color:var(--primary);">
-                            {{ "%.1f"|format(admin_stats.ml_accuracy) }}%
-                        </div>
-                        <p style="text-align:center;color:var(--gray-600);font-size:13px;">AI Model's Success Rate</p>
-                    </div>
-                </div>
-
-                <div>
-                    <h3 style="color:var(--gray-700);margin-bottom:15px;">Reviewer Activity</h3>
-                    <div class="chart-container" style="height:350px;"><canvas id="adminReviewerActivityChart"></canvas></div>
-                </div>
-            </div>
-        </div>
-
-        <div class="card">
-            <h2>🚨 Articles Requiring Administrative Verification ({{ admin_stats.needs_admin_review }})</h2>
-            {% if admin_review_articles_with_sources %}
-                {% for article in admin_review_articles_with_sources %}
-                    <div class="article-item" style="border-color:#3b82f6;">
-                        <h3>{{ article.title }} 
-                            <span style="font-size:12px;color:var(--gray-600);">
-                                Submitted by: {{ article.submitted_by_name }} | Reviewed by: {{ article.reviewed_by_name }}
-                            </span>
-                        </h3>
-                        {% if article.image_path %}
-                            <img src="{{ url_for('static', filename='uploads/' ~ article.image_path.split('/')[-1]) }}" class="article-image" alt="Article Image">
-                        {% endif %}
-                        <p style="color:var(--gray-700); font-size:14px; margin-top:10px;">{{ article.text[:200] }}...</p>
-                        <div style="margin:10px 0;">
-                            <span class="badge {% if article.ml_prediction == 'Fake' %}badge-fake{% else %}badge-real{% endif %}">
-                                🤖 ML: {{ article.ml_prediction }} ({{ "%.0f"|format(article.ml_confidence * 100) }}%)
-                            </span>
-                            <span class="badge {% if article.final_verdict == 'Fake' %}badge-danger{% else %}badge-success{% endif %}" style="margin-left:10px;">
-                                ✍️ Reviewer Verdict: {{ article.final_verdict }}
-                            </span>
-                        </div>
-
-                        <form method="POST" style="margin-top:20px; display:flex; gap:10px; align-items:flex-end;">
-                            <input type="hidden" name="article_id" value="{{ article.id }}">
-                            <input type="hidden" name="action" value="admin_verify">
-                            <div class="form-group" style="flex-grow:1; margin-bottom:0;">
-                                <label style="font-weight:600; font-size:13px;">Admin Final Verdict</label>
-                                <select name="admin_verdict">
-                                    <option value="Real">Real News (Final Admin Veto)</option>
-                                    <option value="Fake">Fake News (Final Admin Veto)</option>
-                                </select>
-                            </div>
-                            <button type="submit" class="btn btn-primary" style="padding:15px 30px; margin-bottom:0; flex-shrink:0;">Finalize & Publish</button>
-                        </form>
-                    </div>
-                {% endfor %}
-            {% else %}
-                <p style="color:var(--gray-600); text-align:center; padding:20px;">All articles have been reviewed. System is clean!</p>
-            {% endif %}
-        </div>
-    </div>
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {
-            // Chart 1: Article Status Distribution
-            new Chart(document.getElementById('adminStatusChart'), {
-                type: 'pie',
-                data: {
-                    labels: ['Pending', 'Reviewed by Reviewer', 'Admin Reviewed'],
-                    datasets: [{
-                        data: [{{ pending_count }}, {{ reviewed_count }}, {{ admin_reviewed_count }}],
-                        backgroundColor: ['#F59E0B', '#10B981', '#3B82F6'],
-                        hoverOffset: 4
-                    }]
-                },
-                options: { responsive: true, maintainAspectRatio: false, plugins: { legend: { position: 'bottom' } } }
-            });
-
-            // Chart 2: Final Verdict Distribution
-            new Chart(document.getElementById('adminVerdictChart'), {
-                type: 'doughnut',
-                data: {
-                    labels: ['Real News', 'Fake News'],
-                    datasets: [{
-                        data: [{{ final_verdict_counts.Real }}, {{ final_verdict_counts.Fake }}],
-                        backgroundColor: ['#10B981', '#EF4444'],
-                        hoverOffset: 4
-                    }]
-                },
-                options: { responsive: true, maintainAspectRatio: false, cutout: '70%', plugins: { legend: { position: 'bottom' } } }
-            });
-
-            // Chart 3: ML Accuracy (Gauge)
-            new Chart(document.getElementById('adminAccuracyChart'), {
-                type: 'doughnut',
-                data: {
-                    labels: ['Correct', 'Incorrect'],
-                    datasets: [{
-                        data: [{{ admin_stats.ml_accuracy | int }}, {{ 100 - (admin_stats.ml_accuracy | int) }}],
-                        backgroundColor: ['#2563EB', '#E5E7EB'],
-                        borderWidth: 0
-                    }]
-                },
-                options: {
-                    responsive: true, maintainAspectRatio: false, cutout: '80%',
-                    plugins: { legend: { display: false }, tooltip: { enabled: false } },
-                    rotation: -90, circumference: 180,
-                }
-            });
-
-            // Chart 4: Reviewer Activity Bar Chart
-            const reviewerNames = {{ reviewer_activity.keys() | list | tojson }};
-            const reviewedCounts = {{ reviewer_activity.values() | list | tojson }};
-
-            new Chart(document.getElementById('adminReviewerActivityChart'), {
-                type: 'bar',
-                data: {
-                    labels: reviewerNames,
-                    datasets: [{
-                        label: 'Articles Reviewed',
-                        data: reviewedCounts,
-                        backgroundColor: '#7c3aed',
-                        borderRadius: 8,
-                    }]
-                },
-                options: {
-                    responsive: true, maintainAspectRatio: false,
-                    plugins: { legend: { display: false } },
-                    scales: {
-                        y: { beginAtZero: true, title: { display: true, text: 'Number of Articles' } },
-                        x: { grid: { display: false } }
-                    }
-                }
-            });
-        });
-    </script>
-    ''')
-    
-    return render_template_string(html, admin_stats=admin_stats, pending_count=pending_count, reviewed_count=reviewed_count, 
-                                  admin_reviewed_count=admin_reviewed_count, final_verdict_counts=final_verdict_counts, 
-                                  admin_review_articles_with_sources=admin_review_articles_with_sources, 
-                                  reviewer_activity=reviewer_activity)
+    return render_template('admin_dashboard.html', admin_stats=admin_stats, pending_count=pending_count, reviewed_count=reviewed_count, 
+                           admin_reviewed_count=admin_reviewed_count, final_verdict_counts=final_verdict_counts, 
+                           admin_review_articles_with_sources=admin_review_articles, 
+                           reviewer_activity=reviewer_activity)
+
+@app.route('/reviewer/events')
+def reviewer_events():
+    """Server-sent events: submissions, classifications, reviews and releases as they commit.
+
+    The stream never touches the database, so idle reviewers cost a thread and a queue,
+    not queries. Browsers reconnect with Last-Event-ID and get the events they missed.
+    """
+    if 'user_id' not in session or session.get('user_role') not in ('reviewer', 'admin'):
+        return jsonify({'error': 'unauthorized'}), 401
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    queue_events = get_queue_events()
+    subscriber = queue_events.subscribe(int(last_event_id) if last_event_id.isdigit() else None)
+    return Response(sse_stream(queue_events, subscriber, app.config['SSE_HEARTBEAT_SECONDS']),
+                    mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Snippet highlight markers. Submitted titles and texts are stored without them (see
+# strip_markers and migration 12), so every marker in a snippet was put there by FTS5.
+_MARK_START, _MARK_END = '\x02', '\x03'
+_NO_MARKERS = str.maketrans('', '', _MARK_START + _MARK_END)
+
+def strip_markers(text):
+    """Text without the snippet highlight marker characters."""
+    return text.translate(_NO_MARKERS)
+
+def fts_query(text):
+    """Turn free text into an FTS5 query that matches all words, whatever punctuation they contain."""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+@app.route('/search')
+def search():
+    """Full-text search over article titles and bodies, best BM25 match first."""
+    if 'user_id' not in session or session.get('user_role') not in ('reviewer', 'admin'):
+        return redirect(url_for('login'))
+
+    query = request.args.get('q', '').strip()
+    status = request.args.get('status', '')
+    verdict = request.args.get('verdict', '')
+    results = []
+    if query:
+        filters, params = '', [fts_query(query)]
+        if status in ('pending', 'reviewed', 'admin_reviewed'):
+            filters += ' AND a.status = ?'
+            params.append(status)
+        if verdict in ('Real', 'Fake'):
+            filters += ' AND a.final_verdict = ?'
+            params.append(verdict)
+        params.append(app.config['SEARCH_RESULTS'])
+        # Title matches weigh five times as much as body matches
+        rows = get_db().execute(f'''SELECT a.id, a.title, a.status, a.final_verdict, a.submitted_at,
+                                           snippet(articles_fts, 1, '{_MARK_START}', '{_MARK_END}', '…', 24) AS snippet
+                                    FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+                                    WHERE articles_fts MATCH ?{filters}
+                                    ORDER BY bm25(articles_fts, 5.0, 1.0) LIMIT ?''', params).fetchall()
+        results = [dict(row, snippet=highlight(row['snippet'])) for row in rows]
+
+    if request.args.get('format') == 'json':
+        return jsonify([dict(result, snippet=str(result['snippet'])) for result in results])
+    return render_template('search.html', query=query, status=status, verdict=verdict, results=results)
+
+@app.route('/admin/cache-stats')
+def cache_stats():
+    """Hit/miss counters of this process's classification cache."""
+    if 'user_id' not in session or session.get('user_role') != 'admin':
+        return jsonify({'error': 'unauthorized'}), 401
+    return jsonify(get_classification_cache().stats())
+
+# --- JSON API ---
+# Pollers send back the ETag they were given. It is built from the trigger-maintained
+# change_versions counters, so an unchanged poll costs one small lookup and a 304,
+# without touching the articles table.
+
+def conditional_json(keys, build, tag):
+    """JSON of build(), or 304 Not Modified if the client's copy is still current.
+
+    keys are the (scope, owner_id) change counters the payload depends on; tag tells apart
+    payloads behind the same counters (e.g. the page). build may return None for a 404.
+    """
+    versions = get_versions(get_db(), keys)
+    etag = tag + ':' + ','.join(f'{scope}{owner_id}.{versions[(scope, owner_id)][0]}' for scope, owner_id in keys)
+    # HTTP dates have whole seconds: round the last change up, and leave Last-Modified out
+    # until that second is over, or a later change in the same second would look unmodified
+    changed_at = math.ceil(max(changed for _, changed in versions.values()))
+    last_modified = None
+    if changed_at and changed_at <= time.time():
+        last_modified = datetime.fromtimestamp(changed_at, timezone.utc)
+
+    # If-None-Match wins over If-Modified-Since when a client sends both
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        fresh = (last_modified is not None and request.if_modified_since is not None
+                 and last_modified <= request.if_modified_since)
+    if fresh:
+        response = Response(status=304)
+        response.vary.add('Accept-Encoding')
+    else:
+        payload = build()
+        if payload is None:
+            return jsonify({'error': 'not found'}), 404
+        response = compress_response(jsonify(payload), request.accept_encodings, app.config['API_COMPRESS_MIN_BYTES'])
+    # Weak, since the gzip and brotli bodies share it
+    response.set_etag(etag, weak=True)
+    # Werkzeug turns a None Last-Modified into the current time, so only set a real one
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def article_status(article, source_lists):
+    return {
+        'id': article['id'],
+        'title': article['title'],
+        'submitted_at': article['submitted_at'],
+        'status': article['status'],
+        'classifying': bool(article['classifying']),
+        'ml_prediction': article['ml_prediction'],
+        'ml_confidence': article['ml_confidence'],
+        'final_verdict': article['final_verdict'],
+        'sources': list(source_lists.get(article['source_set_id'], ())),
+    }
+
+@app.route('/api/articles')
+def api_articles():
+    """The logged-in user's articles, newest first, one keyset page at a time."""
+    if 'user_id' not in session or session.get('user_role') != 'user':
+        return jsonify({'error': 'unauthorized'}), 401
+    user_id, cursor = session['user_id'], parse_cursor(request.args.get('before'))
+
+    def build():
+        conn = get_db()
+        articles, next_cursor = fetch_page(conn.cursor(), DASHBOARD_QUERIES['user_articles'], (user_id,),
+                                           cursor, 'submitted_at')
+        source_lists = source_sets.lookup(conn, (article['source_set_id'] for article in articles))
+        return {'articles': [article_status(article, source_lists) for article in articles], 'next': next_cursor}
+    # Cursor ids are unique, so the id alone tells the pages apart
+    return conditional_json([('submitter', user_id)], build, f'articles-{cursor[1]}')
+
+@app.route('/api/articles/<int:article_id>')
+def api_article(article_id):
+    """Status of one article: users may see their own, reviewers and admins any."""
+    role = session.get('user_role')
+    if 'user_id' not in session or role not in ('user', 'reviewer', 'admin'):
+        return jsonify({'error': 'unauthorized'}), 401
+    owner = session['user_id'] if role == 'user' else None
+
+    def build():
+        conn = get_db()
+        article = conn.execute('''SELECT id, title, submitted_at, status, classifying, ml_prediction, ml_confidence,
+                                         final_verdict, source_set_id, submitted_by FROM articles WHERE id = ?''',
+                               (article_id,)).fetchone()
+        if article is None or (owner is not None and article['submitted_by'] != owner):
+            return None
+        return article_status(article, source_sets.lookup(conn, [article['source_set_id']]))
+    keys = [('submitter', owner)] if owner is not None else [('all', 0)]
+    return conditional_json(keys, build, f'article-{article_id}')
+
+@app.route('/api/dashboard/stats')
+def api_dashboard_stats():
+    """The counters behind the logged-in user's dashboard."""
+    role = session.get('user_role')
+    if 'user_id' not in session or role not in ('user', 'reviewer', 'admin'):
+        return jsonify({'error': 'unauthorized'}), 401
+    user_id = session['user_id']
+
+    if role == 'user':
+        return conditional_json([('submitter', user_id)], lambda: user_stats(get_db(), user_id), 'stats')
+    if role == 'reviewer':
+        def build():
+            stats, verdict_counts, ml_prediction_counts = reviewer_stats(get_db(), user_id)
+            return dict(stats, verdicts=verdict_counts, ml_predictions=ml_prediction_counts)
+        # Pending totals move with the queue, the rest with this reviewer's own reviews
+        return conditional_json([('queue', 0), ('reviewer', user_id)], build, 'stats')
+    return conditional_json([('all', 0)], lambda: get_counters(get_db(), 'all'), 'stats')
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the tables and apply pending schema migrations."""
+    applied = init_db()
+    click.echo(f'Applied migrations: {applied}' if applied else 'Database schema is up to date')
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any dashboard query needs a full table scan or a temporary sort."""
+    sample_params = {
+        'user_articles': (1, *FIRST_PAGE_CURSOR, 1),
+        'claimed_articles': (1, FIRST_PAGE_CURSOR[0]),
+        'reviewer_articles': (1, *FIRST_PAGE_CURSOR, 1),
+    }
+    queries = {name: (sql, sample_params.get(name, ())) for name, sql in DASHBOARD_QUERIES.items()}
+    problems = migrations.find_slow_plans(get_db(), queries)
+    for name, detail in problems:
+        click.echo(f'{name}: {detail}')
+    if problems:
+        raise click.ClickException(f'{len(problems)} dashboard query plan step(s) not served by an index')
+    click.echo(f'All {len(queries)} dashboard queries use indexes')
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the dashboard counters from the articles table."""
+    conn = get_db()
+    with conn:
+        rebuild_counters(conn)
+    click.echo('Dashboard counters rebuilt')
+
+@app.cli.command('build-image-variants')
+def build_image_variants_command():
+    """Create missing thumbnails and web variants for every stored upload."""
+    folder = app.config['UPLOAD_FOLDER']
+    names = [name for name in os.listdir(folder) if allowed_file(name)] if os.path.isdir(folder) else []
+    failed = 0
+    for name in names:
+        # One unreadable or truncated upload should not stop the rest
+        try:
+            make_derivatives(os.path.join(folder, name), folder)
+        except Exception as error:
+            failed += 1
+            click.echo(f'Skipped {name}: {error}', err=True)
+    click.echo(f'Processed {len(names) - failed} uploads' + (f'; {failed} failed' if failed else ''))
+
+@app.cli.command('build-duplicate-index')
+@click.option('--batch-size', type=int, help='Articles per transaction.')
+def build_duplicate_index_command(batch_size):
+    """Add every article missing from the near-duplicate index, oldest first."""
+    batch_size = batch_size or app.config['INGEST_BATCH_SIZE']
+    conn = get_db()
+    indexed = last_id = 0
+    while True:
+        rows = conn.execute('''SELECT a.id, a.text FROM articles a
+                               WHERE a.id > ? AND NOT EXISTS (SELECT 1 FROM article_minhash m WHERE m.article_id = a.id)
+                               ORDER BY a.id LIMIT ?''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        signatures = map_in_pool(minhash_signature, [row['text'] for row in rows])
+        with conn:
+            for row, signature in zip(rows, signatures):
+                flag_near_duplicate(conn, row['id'], signature)
+        indexed += len(rows)
+        last_id = rows[-1]['id']
+    click.echo(f'Indexed {indexed} articles')
+
+@app.cli.command('import-articles')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--email', default='user@system.com', show_default=True, help='Account the articles are submitted as.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, help='Articles per transaction.')
+def import_articles_command(path, email, fmt, batch_size):
+    """Bulk import articles from a JSONL or CSV file."""
+    user = get_db().execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone()
+    if user is None:
+        raise click.ClickException(f'No user with email {email}')
+
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8', newline='') as stream:
+        try:
+            inserted, skipped = ingest_articles(iter_article_records(stream, fmt), user[0], batch_size)
+        except IngestError as error:
+            raise click.ClickException(f'{error} ({error.inserted} imported, {error.skipped} skipped)')
+    click.echo(f'Imported {inserted} articles ({skipped} skipped)')
+
+@app.cli.command('rescore-articles')
+@click.option('--all', 'rescore_all', is_flag=True, help='Also re-score reviewed articles (default: pending only).')
+@click.option('--batch-size', type=int, help='Articles per transaction.')
+def rescore_articles_command(rescore_all, batch_size):
+    """Re-run the classifier over stored articles, e.g. after keyword changes."""
+    batch_size = batch_size or app.config['INGEST_BATCH_SIZE']
+    status_filter = '' if rescore_all else "AND status = 'pending'"
+    conn = get_db()
+    # Cached results came from the old classifier
+    with conn:
+        get_classification_cache().clear(conn)
+    rescored = last_id = 0
+    while True:
+        rows = conn.execute(f'''SELECT id, title, text FROM articles WHERE id > ? {status_filter}
+                                ORDER BY id LIMIT ?''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        results = classify_articles((title, text) for _, title, text in rows)
+        with conn:
+            set_ids = source_set_ids(conn, (sources_json for _, _, sources_json in results))
+            conn.executemany('''UPDATE articles SET ml_prediction = ?, ml_confidence = ?, source_set_id = ?
+                                WHERE id = ?''',
+                             [(prediction, confidence, set_id, row[0])
+                              for row, (prediction, confidence, _), set_id in zip(rows, results, set_ids)])
+        rescored += len(rows)
+        last_id = rows[-1][0]
+    click.echo(f'Re-scored {rescored} articles')
+
+@app.cli.command('purge-classification-cache')
+def purge_classification_cache_command():
+    """Drop expired classification_cache rows and the oldest beyond CLASSIFICATION_CACHE_DB_ROWS."""
+    conn = get_db()
+    with conn:
+        deleted = get_classification_cache().purge(conn)
+    click.echo(f'Purged {deleted} cached classification results')
+
+def iter_labelled_articles(conn, cursor, chunk_size):
+    """Yield chunks of reviewed articles after a (label time, id) cursor, oldest label first.
+
+    Rows are read by keyset on (label time, id), so only one chunk is in memory at a
+    time. The label time is when the admin verified the article, else when it was reviewed.
+    """
+    while True:
+        rows = conn.execute('''SELECT id, title, text, final_verdict, ml_prediction, admin_verified,
+                                     COALESCE(admin_verified_at, reviewed_at) AS labelled_at
+                              FROM articles
+                              WHERE final_verdict IS NOT NULL
+                                AND (COALESCE(admin_verified_at, reviewed_at), id) > (?, ?)
+                              ORDER BY COALESCE(admin_verified_at, reviewed_at), id LIMIT ?''',
+                           (*cursor, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        cursor = (rows[-1]['labelled_at'], rows[-1]['id'])
+
+@app.cli.command('train-classifier')
+@click.option('--full', is_flag=True, help='Start a new model instead of updating the current one.')
+@click.option('--chunk-size', type=int, help='Labelled articles per training step.')
+def train_classifier_command(full, chunk_size):
+    """Update the linear TF-IDF model with verdicts given since it was last trained.
+
+    Admin-verified verdicts count double. The result is published as a new numbered
+    model file, which running apps load within CLASSIFIER_RELOAD_INTERVAL.
+    """
+    model_path = app.config['CLASSIFIER_MODEL_PATH']
+    chunk_size = chunk_size or app.config['TRAINING_CHUNK_SIZE']
+    model = LinearClassifier()
+    if os.path.exists(model_path):
+        try:
+            current = LinearClassifier.load(model_path)
+        except ValueError as error:
+            if not full:
+                raise click.ClickException(str(error))
+            current = LinearClassifier(version=saved_model_version(model_path))
+        model = LinearClassifier(version=current.model_version) if full else current
+    # trained_through is a 'timestamp_id' cursor, like the dashboard page cursors
+    cursor = parse_cursor(model.trained_through) if model.trained_through else ('', 0)
+    trained = model_correct = live_correct = 0
+    for rows in iter_labelled_articles(get_db(), cursor, chunk_size):
+        rows = [row for row in rows if row['final_verdict'] in ('Real', 'Fake')]
+        if not rows:
+            continue
+        model_correct += model.partial_fit([(row['title'], row['text']) for row in rows],
+                                           [row['final_verdict'] for row in rows],
+                                           [2.0 if row['admin_verified'] else 1.0 for row in rows])
+        live_correct += sum(row['ml_prediction'] == row['final_verdict'] for row in rows)
+        trained += len(rows)
+        model.trained_through = f"{rows[-1]['labelled_at']}_{rows[-1]['id']}"
+    if not trained:
+        click.echo('No new verdicts since the current model was trained')
+        return
+    model.model_version += 1
+    artifact = publish_model(model, model_path)
+    click.echo(f'Trained on {trained} new verdicts; wrote {artifact} and published it to {model_path}')
+    click.echo(f'Accuracy on them before training: model {model_correct / trained:.1%}, '
+               f'stored predictions {live_correct / trained:.1%}')
+
+@app.cli.command('classification-worker')
+def classification_worker_command():
+    """Drain the classification job queue in this process until interrupted."""
+    classification_queue = get_classification_queue()
+    classification_queue.start()
+    click.echo(f"Classifying with {classification_queue.workers} workers; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        classification_queue.stop()
+
+@app.cli.command('job-queue')
+@click.option('--retry-dead', is_flag=True, help='Give dead jobs a fresh set of attempts.')
+def job_queue_command(retry_dead):
+    """Show the classification queue and the jobs that were given up on."""
+    conn = get_db()
+    classification_queue = get_classification_queue()
+    if retry_dead:
+        click.echo(f'Requeued {classification_queue.retry_dead(conn)} dead jobs')
+        classification_queue.notify()
+    status = classification_queue.status(conn)
+    click.echo(f"classify: {status['due']} due, {status['waiting']} leased or backing off, {status['dead']} dead")
+    for job_id, article_id, attempts, last_error in classification_queue.dead_jobs(conn):
+        click.echo(f'  job {job_id} article {article_id}: {attempts} attempts, last error {last_error}')
+
+def precompile_templates():
+    """Compile every template up front; Jinja's loader cache then serves them to all requests."""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+if app.config['PRECOMPILE_TEMPLATES']:
+    precompile_templates()
 
 if __name__ == '__main__':
     # Initial setup for the database and default users
-    init_db()
+    with app.app_context():
+        init_db()
     app.run(debug=True)
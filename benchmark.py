@@ -0,0 +1,226 @@
+# benchmark.py - Performance benchmarks against a synthetic corpus in a temporary database
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --sizes 1000,100000 --repeat 20
+#
+# Results are written as JSON so runs from different releases can be diffed.
+
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import click
+
+import app as fake_news
+from classifiers import FAKE_KEYWORDS, REAL_KEYWORDS
+from db import get_db
+
+FILLER_WORDS = ('the a of and to in is that for on with as was by it from at this be are have has officials '
+                'city government people report week year market health climate vaccine stock earnings '
+                'people said new local state national company announced plan public policy').split()
+KEYWORDS = list(FAKE_KEYWORDS) + list(REAL_KEYWORDS)
+TITLE_TOPICS = ('climate', 'vaccine', 'health', 'stock', 'earnings', 'council', 'election', 'weather')
+BENCH_USERS = 20
+BENCH_REVIEWERS = 5
+
+def synthetic_text(rng, words):
+    """Filler text of about `words` words with a keyword every ~15 words."""
+    return ' '.join(rng.choice(KEYWORDS) if rng.random() < 0.07 else rng.choice(FILLER_WORDS)
+                    for _ in range(words))
+
+def synthetic_title(rng, n):
+    return f'{rng.choice(TITLE_TOPICS).title()} update {n}: {synthetic_text(rng, 5)}'
+
+def percentiles(samples):
+    """Summary of timings in seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+    return {'n': len(ordered), 'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p50_ms': at(0.50), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': round(ordered[-1] * 1000, 3)}
+
+def seed_users(conn):
+    """Extra submitters and reviewers so counters and joins are spread like production."""
+    password = fake_news.generate_password_hash('bench')
+    with conn:
+        conn.executemany('INSERT OR IGNORE INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
+                         [(f'Bench User {i}', f'bench-user-{i}@example.com', password, 'user')
+                          for i in range(BENCH_USERS)] +
+                         [(f'Bench Reviewer {i}', f'bench-reviewer-{i}@example.com', password, 'reviewer')
+                          for i in range(BENCH_REVIEWERS)])
+    users = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'user'")]
+    reviewers = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'reviewer'")]
+    return users, reviewers
+
+def generate_corpus(conn, target_rows, rng, review_fraction=0.7, batch_size=5000):
+    """Top the articles table up to target_rows synthetic articles, most of them reviewed.
+
+    Rows are written directly, with classification results drawn at random, so that a
+    million-row corpus takes minutes rather than hours. Triggers still maintain the
+    counters and the search index.
+    """
+    users, reviewers = seed_users(conn)
+    source_set_ids = [fake_news.source_sets.intern(conn, source_set.json)
+                      for source_set in fake_news.get_source_router().source_sets]
+    conn.commit()
+    existing = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+    start = datetime(2024, 1, 1)
+    while existing < target_rows:
+        rows = []
+        for n in range(existing, min(existing + batch_size, target_rows)):
+            submitted_at = start + timedelta(seconds=n * 30)
+            prediction = rng.choice(('Real', 'Fake'))
+            reviewed = rng.random() < review_fraction
+            verdict = (prediction if rng.random() < 0.8 else ('Fake' if prediction == 'Real' else 'Real')) if reviewed else None
+            flagged = 1 if reviewed and rng.random() < 0.05 else 0
+            rows.append((synthetic_title(rng, n), synthetic_text(rng, rng.randint(30, 80)), rng.choice(users),
+                         submitted_at.isoformat(), prediction, round(rng.uniform(0.55, 0.95), 2),
+                         'reviewed' if reviewed else 'pending', rng.choice(reviewers) if reviewed else None, verdict,
+                         (submitted_at + timedelta(hours=2)).isoformat() if reviewed else None, flagged,
+                         rng.choice(source_set_ids)))
+        with conn:
+            conn.executemany('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction, ml_confidence,
+                                                      status, reviewed_by, final_verdict, reviewed_at, needs_admin_review,
+                                                      source_set_id)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        existing += len(rows)
+    conn.execute('ANALYZE')
+
+def bench_classify(rng, text_sizes, articles):
+    """classify_article one call at a time, and classify_articles as one batch, per text size."""
+    results = []
+    for words in text_sizes:
+        pairs = [(synthetic_title(rng, i), synthetic_text(rng, words)) for i in range(articles)]
+        started = time.perf_counter()
+        for title, text in pairs:
+            fake_news.classify_article(text, title)
+        single = time.perf_counter() - started
+        started = time.perf_counter()
+        fake_news.classify_articles(pairs)
+        batch = time.perf_counter() - started
+        results.append({'words': words, 'articles': articles,
+                        'classify_article_per_sec': round(articles / single, 1),
+                        'classify_articles_per_sec': round(articles / batch, 1)})
+    return results
+
+def login(email, password):
+    client = fake_news.app.test_client()
+    client.post('/login', data={'email': email, 'password': password})
+    return client
+
+def timed_requests(requests):
+    """Run (client, method, url, data) requests, returning their latencies in seconds."""
+    samples = []
+    for client, method, url, data in requests:
+        started = time.perf_counter()
+        response = client.open(url, method=method, data=data)
+        samples.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise click.ClickException(f'{method} {url} returned {response.status_code}')
+    return samples
+
+def bench_submit(rng, count, words):
+    """POST /user/dashboard latency, classifying inline and through the background queue."""
+    user = login('user@system.com', 'user123')
+    results = {}
+    for mode, async_mode in (('sync', False), ('async', True)):
+        fake_news.app.config['ASYNC_CLASSIFICATION'] = async_mode
+        requests = [(user, 'POST', '/user/dashboard',
+                     {'title': synthetic_title(rng, i), 'text': synthetic_text(rng, words)}) for i in range(count)]
+        results[mode] = percentiles(timed_requests(requests))
+    fake_news.app.config['ASYNC_CLASSIFICATION'] = False
+    return results
+
+def bench_review(count):
+    """POST /reviewer/dashboard latency for reviewing the newest pending articles."""
+    reviewer = login('reviewer@system.com', 'reviewer123')
+    with fake_news.app.app_context():
+        pending = [row[0] for row in get_db().execute('''SELECT id FROM articles WHERE status = 'pending'
+                                                         ORDER BY submitted_at DESC, id DESC LIMIT ?''', (count,))]
+    requests = [(reviewer, 'POST', '/reviewer/dashboard',
+                 {'article_id': article_id, 'action': 'review', 'final_verdict': 'Real'}) for article_id in pending]
+    return percentiles(timed_requests(requests))
+
+def bench_dashboards(repeat):
+    clients = {
+        'admin_dashboard': (login('admin@system.com', 'admin123'), '/admin/dashboard'),
+        'reviewer_dashboard': (login('reviewer@system.com', 'reviewer123'), '/reviewer/dashboard'),
+        'user_dashboard': (login('user@system.com', 'user123'), '/user/dashboard'),
+    }
+    results = {}
+    for name, (client, url) in clients.items():
+        timed_requests([(client, 'GET', url, None)])  # warm caches
+        results[name] = percentiles(timed_requests([(client, 'GET', url, None)] * repeat))
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@click.command()
+@click.option('--sizes', default='1000,100000,1000000', show_default=True,
+              help='Comma-separated corpus sizes (articles) for the dashboard benchmarks.')
+@click.option('--text-sizes', default='50,500,5000', show_default=True,
+              help='Comma-separated article lengths (words) for the classifier benchmark.')
+@click.option('--classify-articles', default=500, show_default=True, help='Articles per classifier measurement.')
+@click.option('--requests', 'request_count', default=200, show_default=True, help='POSTs per latency measurement.')
+@click.option('--repeat', default=20, show_default=True, help='Page loads per dashboard measurement.')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON report here instead of stdout.')
+def main(sizes, text_sizes, classify_articles, request_count, repeat, seed, output):
+    """Benchmark classification, submit/review latency and dashboard rendering."""
+    rng = random.Random(seed)
+    sizes = sorted(int(size) for size in sizes.split(','))
+    report = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'classifier': fake_news.get_classifier().get().version,
+            'seed': seed,
+        },
+        'classify': bench_classify(rng, [int(words) for words in text_sizes.split(',')], classify_articles),
+        'corpus': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='fake-news-bench-') as folder:
+        fake_news.app.config['DATABASE'] = os.path.join(folder, 'bench.db')
+        fake_news.app.config['UPLOAD_FOLDER'] = os.path.join(folder, 'uploads')
+        with fake_news.app.app_context():
+            fake_news.init_db()
+        for size in sizes:
+            click.echo(f'Generating {size} articles...', err=True)
+            started = time.perf_counter()
+            # Requests below must not run inside this context, or they would share its connection
+            with fake_news.app.app_context():
+                generate_corpus(get_db(), size, rng)
+            generated_in = time.perf_counter() - started
+            click.echo(f'Measuring at {size} articles...', err=True)
+            report['corpus'].append({
+                'rows': size,
+                'generate_seconds': round(generated_in, 2),
+                'dashboards': bench_dashboards(repeat),
+                'submit': bench_submit(rng, request_count, 300),
+                'review': bench_review(request_count),
+            })
+        fake_news.get_classification_queue().stop()
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        click.echo(text)
+
+if __name__ == '__main__':
+    main()
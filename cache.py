@@ -0,0 +1,123 @@
+# cache.py - Classification results keyed by a hash of the normalized article content
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+_WHITESPACE = re.compile(r'\s+')
+
+def content_key(title, text, namespace=''):
+    """SHA-256 of title and text, lowercased with whitespace collapsed.
+
+    Reposts that differ only in case or spacing share a key. The namespace (the
+    classifier and topic table versions) keeps results from different models and
+    source routing apart.
+    """
+    normalized = '\0'.join(_WHITESPACE.sub(' ', part).strip().lower() for part in (title, text))
+    normalized = f'{namespace}\0{normalized}' if namespace else normalized
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class ResultCache:
+    """Two-tier cache of (prediction, confidence, source_set_id) results.
+
+    The first tier is an in-process LRU bounded by max_entries, whose entries expire
+    after ttl seconds. The second tier is the classification_cache table, which
+    survives restarts and is shared by every worker process. Rows older than db_ttl
+    seconds, and the oldest rows beyond db_max_rows, are purged every time this
+    process has written another hundredth of db_max_rows.
+    """
+
+    def __init__(self, max_entries, ttl, db_max_rows, db_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_max_rows = db_max_rows
+        self.db_ttl = db_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_purge = 0
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def _get_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, conn, keys):
+        """Look keys up in memory, then in SQLite. Returns {key: result} for the hits."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._get_memory(key)
+                if value is not None:
+                    found[key] = value
+            self.counters['memory_hits'] += len(found)
+
+        remaining = [key for key in set(keys) if key not in found]
+        if remaining:
+            placeholders = ', '.join('?' * len(remaining))
+            rows = conn.execute(f'''SELECT content_hash, ml_prediction, ml_confidence, source_set_id
+                                    FROM classification_cache WHERE content_hash IN ({placeholders})''',
+                                remaining).fetchall()
+            with self._lock:
+                for row in rows:
+                    value = (row[1], row[2], row[3])
+                    found[row[0]] = value
+                    self._put_memory(row[0], value)
+                self.counters['db_hits'] += len(rows)
+                self.counters['misses'] += len(remaining) - len(rows)
+        return found
+
+    def put_many(self, conn, results):
+        """Store {key: (prediction, confidence, source_set_id)} in both tiers. Caller commits."""
+        now = datetime.now().isoformat()
+        conn.executemany('''INSERT OR REPLACE INTO classification_cache
+                            (content_hash, ml_prediction, ml_confidence, source_set_id, created_at)
+                            VALUES (?, ?, ?, ?, ?)''',
+                         [(key, *value, now) for key, value in results.items()])
+        with self._lock:
+            for key, value in results.items():
+                self._put_memory(key, value)
+            self._writes_since_purge += len(results)
+            due = self._writes_since_purge >= max(self.db_max_rows // 100, 1)
+            if due:
+                self._writes_since_purge = 0
+        if due:
+            self.purge(conn)
+
+    def purge(self, conn):
+        """Delete table rows past db_ttl or beyond the newest db_max_rows. Returns the count. Caller commits."""
+        cutoff = (datetime.now() - timedelta(seconds=self.db_ttl)).isoformat()
+        deleted = conn.execute('DELETE FROM classification_cache WHERE created_at < ?', (cutoff,)).rowcount
+        # Walks the created_at index to the oldest row still allowed, not the whole table
+        deleted += conn.execute('''DELETE FROM classification_cache WHERE created_at <
+                                      (SELECT created_at FROM classification_cache
+                                       ORDER BY created_at DESC LIMIT 1 OFFSET ?)''',
+                                (self.db_max_rows - 1,)).rowcount
+        return deleted
+
+    def clear(self, conn):
+        conn.execute('DELETE FROM classification_cache')
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.counters.values())
+            hits = self.counters['memory_hits'] + self.counters['db_hits']
+            return dict(self.counters, entries=len(self._entries),
+                        hit_rate=(hits / lookups) if lookups else 0.0)
@@ -0,0 +1,57 @@
+# changes.py - Change counters kept up to date by triggers, so pollers can tell when their data moved
+
+# Scope name -> (owner of the counter row, condition on the articles row). {r} is NEW or OLD.
+# 'submitter' is one user's article history, 'queue' the pending review queue and
+# 'all' any article at all.
+SCOPES = {
+    'all': ('0', '1'),
+    'submitter': ('{r}.submitted_by', '1'),
+    'reviewer': ('{r}.reviewed_by', '1'),
+    'queue': ('0', "{r}.status = 'pending'"),
+}
+
+# Columns shown by the dashboards and the API. Claim renewals touch none of them, so a
+# reviewer loading their batch does not invalidate everybody's cached copies.
+VISIBLE_COLUMNS = ('title', 'text', 'status', 'submitted_by', 'ml_prediction', 'ml_confidence', 'reviewed_by',
+                   'final_verdict', 'reviewed_at', 'admin_verified', 'needs_admin_review', 'image_path',
+                   'source_set_id', 'classifying', 'duplicate_of', 'duplicate_similarity')
+
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+def _bump_sql(scope, rows):
+    """Upsert that increments the scope's counter for the owner of each of rows (NEW/OLD)."""
+    owner, condition = SCOPES[scope]
+    selects = ' UNION '.join(f"SELECT '{scope}', {owner.format(r=row)}, 1, {_NOW} "
+                             f"WHERE {owner.format(r=row)} IS NOT NULL AND {condition.format(r=row)}"
+                             for row in rows)
+    return (f'INSERT INTO change_versions (scope, owner_id, version, changed_at) {selects} '
+            f'ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at;')
+
+def install_change_versions(conn):
+    """Create the change_versions table and (re)create its triggers. Safe to run repeatedly."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS change_versions (
+        scope TEXT NOT NULL,
+        owner_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        changed_at REAL NOT NULL,
+        PRIMARY KEY (scope, owner_id)
+    )''')
+    for trigger in ('change_versions_insert', 'change_versions_delete', 'change_versions_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    def body(rows):
+        return '\n'.join(_bump_sql(scope, rows) for scope in SCOPES)
+    conn.execute(f'CREATE TRIGGER change_versions_insert AFTER INSERT ON articles BEGIN\n{body(["NEW"])}\nEND')
+    conn.execute(f'CREATE TRIGGER change_versions_delete AFTER DELETE ON articles BEGIN\n{body(["OLD"])}\nEND')
+    conn.execute(f'''CREATE TRIGGER change_versions_update AFTER UPDATE OF {', '.join(VISIBLE_COLUMNS)} ON articles
+        BEGIN\n{body(["OLD", "NEW"])}\nEND''')
+
+def get_versions(conn, keys):
+    """{(scope, owner_id): (version, changed_at)} for keys; (0, 0.0) for scopes never changed."""
+    versions = dict.fromkeys(keys, (0, 0.0))
+    for scope, owner_id in versions:
+        row = conn.execute('SELECT version, changed_at FROM change_versions WHERE scope = ? AND owner_id = ?',
+                           (scope, owner_id)).fetchone()
+        if row is not None:
+            versions[(scope, owner_id)] = (row[0], row[1])
+    return versions
@@ -0,0 +1,405 @@
+# classifiers.py - Classification engines behind classify_article
+
+import logging
+import os
+import random
+import re
+import shutil
+import threading
+import time
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from sklearn.preprocessing import normalize
+except ImportError:  # only the linear engine needs these
+    np = None
+
+logger = logging.getLogger(__name__)
+
+FAKE_KEYWORDS = {
+    'hoax': 3, 'conspiracy': 3, 'unverified': 2, 'shocking': 2,
+    'miracle cure': 4, 'secret': 2, 'breaking': 2, 'exposed': 2,
+    'they don\'t want you to know': 4, 'incredible': 1, 'amazing': 1
+}
+REAL_KEYWORDS = {
+    'according to': 3, 'research shows': 4, 'official statement': 4,
+    'confirmed': 3, 'study': 3, 'experts': 2, 'published': 2,
+    'peer-reviewed': 4, 'data indicates': 3, 'report': 2
+}
+SOURCE_MARKERS = ('source:', 'according to', 'cited', 'reference')
+
+def build_keyword_matcher(keywords):
+    """Compile keywords into one trie-shaped regex that finds all of them in a single scan.
+
+    Returns (pattern, implied) where implied maps each keyword to the set of keywords it
+    contains, so a longer match also counts any shorter keyword hidden inside it.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def to_regex(node):
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if '' in node else group
+
+    implied = {keyword: {other for other in keywords if other in keyword} for keyword in keywords}
+    return re.compile(to_regex(trie)), implied
+
+KEYWORD_PATTERN, KEYWORD_IMPLIED = build_keyword_matcher(
+    set(FAKE_KEYWORDS) | set(REAL_KEYWORDS) | set(SOURCE_MARKERS))
+
+def find_keywords(text_lower):
+    """Return the set of known keywords occurring anywhere in text_lower (one regex pass)."""
+    found = set()
+    remaining = len(KEYWORD_IMPLIED)
+    pos = 0
+    search = KEYWORD_PATTERN.search
+    while remaining:
+        match = search(text_lower, pos)
+        if match is None:
+            break
+        keyword = match.group()
+        if keyword not in found:
+            found |= KEYWORD_IMPLIED[keyword]
+            remaining = len(KEYWORD_IMPLIED) - len(found)
+        # Restart one character later so overlapping keywords are not skipped
+        pos = match.start() + 1
+    return found
+
+class KeywordClassifier:
+    """Hand-weighted keyword heuristic (the original engine)."""
+
+    name = 'keyword'
+    version = 'keyword-1'
+    # Scoring is per-article Python, so large batches are spread over worker processes
+    batched = False
+
+    def predict(self, title, text):
+        found = find_keywords(text.lower())
+        fake_score = sum(FAKE_KEYWORDS[keyword] for keyword in found if keyword in FAKE_KEYWORDS)
+        real_score = sum(REAL_KEYWORDS[keyword] for keyword in found if keyword in REAL_KEYWORDS)
+
+        has_sources = any(marker in found for marker in SOURCE_MARKERS)
+        has_dates = bool(any(char.isdigit() for char in text[:100]))
+        # Only need to know whether there are fewer than 50 words, so stop splitting after that
+        word_count = len(text.split(None, 50))
+        
+        if has_sources:
+            real_score += 2
+        if has_dates:
+            real_score += 1
+        if word_count < 50:
+            fake_score += 2
+        
+        total_score = fake_score + real_score
+        if total_score > 0:
+            score_diff = abs(fake_score - real_score)
+            confidence = 0.60 + min(score_diff / total_score, 0.35)
+        else:
+            confidence = 0.55
+        
+        if fake_score > real_score:
+            prediction = 'Fake'
+        elif real_score > fake_score:
+            prediction = 'Real'
+        else:
+            prediction = random.choice(['Real', 'Fake'])
+            confidence = 0.55
+        
+        return prediction, min(confidence, 0.95)
+
+    def predict_batch(self, pairs):
+        return [self.predict(title, text) for title, text in pairs]
+
+MODEL_FORMAT = 3
+N_FEATURES = 2 ** 18   # hashed word unigram + bigram buckets
+LEARNING_RATE = 2.0    # gradient step size; features are unit-length rows
+L2_PENALTY = 1e-4
+STEPS_PER_CHUNK = 10   # gradient steps taken on each chunk of labelled rows
+
+# Lowercases ASCII letters and blanks every other ASCII byte that is not a letter, digit
+# or underscore. Bytes of UTF-8 sequences count as word characters.
+WORD_BYTES = bytes((c + 32 if 65 <= c <= 90 else c) if c >= 128 or c == 95 or chr(c).isalnum() else 32
+                   for c in range(256))
+HASH_BASE = 0x100000001B3  # odd, so it has an inverse modulo 2**64
+BIGRAM_MULTIPLIER = 0x9E3779B97F4A7C15
+CHUNK_BYTES = 1 << 20      # text hashed per numpy pass; bounds the temporary arrays
+
+def _powers(base, count):
+    """base**0 .. base**(count - 1) modulo 2**64."""
+    powers = np.full(count, base, dtype=np.uint64)
+    powers[:1] = 1
+    return np.cumprod(powers, dtype=np.uint64)
+
+def _mix(values):
+    """splitmix64 finalizer, so the low bits used as bucket numbers depend on every byte."""
+    values ^= values >> np.uint64(33)
+    values *= np.uint64(0xFF51AFD7ED558CCD)
+    values ^= values >> np.uint64(33)
+    values *= np.uint64(0xC4CEB9FE1A85EC53)
+    values ^= values >> np.uint64(33)
+    return values
+
+class NgramHasher:
+    """Hashed word unigram and bigram counts for a whole batch of documents.
+
+    The batch is joined into one buffer and every token is hashed at once with a
+    polynomial rolling hash over its prefix sums, so no Python code runs per token.
+    Tokens are runs of two or more word bytes (see WORD_BYTES).
+    """
+
+    def __init__(self, n_features, chunk_bytes=CHUNK_BYTES):
+        self.n_features = n_features
+        self.chunk_bytes = chunk_bytes
+        self._powers = self._inverse_powers = np.empty(0, dtype=np.uint64)
+
+    def _power_tables(self, count):
+        """HASH_BASE powers and inverse powers for offsets below count, kept for reuse."""
+        powers, inverse_powers = self._powers, self._inverse_powers
+        if len(powers) < count:
+            count = max(count, self.chunk_bytes + 1)
+            powers = _powers(HASH_BASE, count)
+            inverse_powers = _powers(pow(HASH_BASE, -1, 2 ** 64), count)
+            # Swapped in whole; another thread may be hashing with the old tables
+            self._powers, self._inverse_powers = powers, inverse_powers
+        return powers, inverse_powers
+
+    def transform(self, documents):
+        """Sparse float32 count matrix, one row per document."""
+        chunks, chunk, size = [], [], 0
+        for data in (document.encode() for document in documents):
+            if chunk and size + len(data) > self.chunk_bytes:
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(data)
+            size += len(data) + 1
+        chunks.append(chunk)
+        return sparse.vstack([self._counts(chunk) for chunk in chunks], format='csr')
+
+    def _counts(self, encoded):
+        # Documents are separated by a blank, so no token spans two of them
+        text = np.frombuffer(b' '.join(encoded).translate(WORD_BYTES) + b' ', dtype=np.uint8)
+        edges = np.diff(np.concatenate(([0], text != 32, [0])).astype(np.int8))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        long_enough = ends - starts > 1
+        starts, ends = starts[long_enough], ends[long_enough]
+
+        # prefix[i] = sum of text[j] * HASH_BASE**j for j < i; dividing a token's slice of
+        # it by HASH_BASE**start makes its hash independent of where it occurs
+        powers, inverse_powers = self._power_tables(len(text))
+        prefix = np.zeros(len(text) + 1, dtype=np.uint64)
+        np.cumsum(text * powers[:len(text)], out=prefix[1:])
+        hashes = _mix((prefix[ends] - prefix[starts]) * inverse_powers[starts])
+
+        document_starts = np.cumsum([0] + [len(data) + 1 for data in encoded[:-1]])
+        rows = np.searchsorted(document_starts, starts, side='right') - 1
+        # A bigram is two consecutive tokens of the same document
+        same_row = rows[:-1] == rows[1:]
+        bigrams = _mix(hashes[:-1][same_row] * np.uint64(BIGRAM_MULTIPLIER) ^ hashes[1:][same_row])
+        columns = (np.concatenate([hashes, bigrams]) % np.uint64(self.n_features)).astype(np.int64)
+        rows = np.concatenate([rows, rows[:-1][same_row]])
+        cells, counts = np.unique(rows * self.n_features + columns, return_counts=True)
+        return sparse.csr_matrix((counts.astype(np.float32), (cells // self.n_features, cells % self.n_features)),
+                                 shape=(len(encoded), self.n_features))
+
+def _documents(pairs):
+    return [f'{title}\n{text}' for title, text in pairs]
+
+def tfidf(counts, idf):
+    """Sublinear term frequency times idf, each row scaled to unit length."""
+    weights = counts.tocsr(copy=True)
+    weights.data = (1.0 + np.log(weights.data)) * idf[weights.indices]
+    return normalize(weights, copy=False)
+
+class LinearClassifier:
+    """Logistic model over hashed TF-IDF features, scored a whole batch at a time.
+
+    Document frequencies are kept alongside the weights so training can resume from a
+    saved model with only the newly labelled rows. Only features that have been seen
+    are stored, so the model file stays small however large the hashing space is.
+    """
+
+    name = 'linear'
+    batched = True
+
+    def __init__(self, n_features=N_FEATURES, version=0, trained_through=''):
+        self.n_features = n_features
+        self.model_version = version
+        self.trained_through = trained_through  # 'labelled_at_id' of the newest row trained on
+        self.coef = np.zeros(n_features, dtype=np.float32)
+        self.intercept = 0.0
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.document_count = 0
+        self._update_idf()
+        self._vectorizer = NgramHasher(n_features)
+
+    @property
+    def version(self):
+        return f'linear-{self.model_version}'
+
+    def _update_idf(self):
+        self.idf = (np.log((1.0 + self.document_count) / (1.0 + self.document_frequency)) + 1.0).astype(np.float32)
+
+    def transform(self, pairs):
+        """Sparse, l2-normalized TF-IDF rows for (title, text) pairs."""
+        return tfidf(self._vectorizer.transform(_documents(pairs)), self.idf)
+
+    def _probabilities(self, features):
+        scores = np.clip(features @ self.coef + self.intercept, -30.0, 30.0)
+        return 1.0 / (1.0 + np.exp(-scores))
+
+    def probabilities(self, pairs):
+        """Probability that each article is fake."""
+        return self._probabilities(self.transform(pairs))
+
+    def predict(self, title, text):
+        return self.predict_batch([(title, text)])[0]
+
+    def predict_batch(self, pairs):
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        probabilities = self.probabilities(pairs)
+        fake = probabilities >= 0.5
+        confidence = np.clip(np.where(fake, probabilities, 1.0 - probabilities), 0.5, 0.95)
+        return [('Fake' if is_fake else 'Real', round(float(value), 4))
+                for is_fake, value in zip(fake, confidence)]
+
+    def partial_fit(self, pairs, verdicts, weights=None):
+        """Update the model with one chunk of labelled (title, text) pairs.
+
+        Returns how many of the chunk the model got right before learning from it, an
+        honest estimate of accuracy on unseen rows.
+        """
+        labels = np.array([verdict == 'Fake' for verdict in verdicts], dtype=np.float32)
+        weights = np.ones(len(labels), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+        counts = self._vectorizer.transform(_documents(pairs))
+        correct = int(((self._probabilities(tfidf(counts, self.idf)) >= 0.5) == labels.astype(bool)).sum())
+
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.document_count += len(labels)
+        self._update_idf()
+        features = tfidf(counts, self.idf)
+        total_weight = weights.sum()
+        for _ in range(STEPS_PER_CHUNK):
+            error = (self._probabilities(features) - labels) * weights / total_weight
+            self.coef -= LEARNING_RATE * (features.T @ error + L2_PENALTY * self.coef)
+            self.intercept -= LEARNING_RATE * float(error.sum())
+        return correct
+
+    def save(self, path):
+        """Write the model to a compressed .npz file, atomically."""
+        features = np.flatnonzero(self.document_frequency).astype(np.int32)
+        folder = os.path.dirname(path) or '.'
+        os.makedirs(folder, exist_ok=True)
+        temp_path = f'{path}.part.npz'
+        np.savez_compressed(temp_path, format=MODEL_FORMAT, n_features=self.n_features,
+                            version=self.model_version, trained_through=self.trained_through,
+                            intercept=self.intercept, document_count=self.document_count, features=features,
+                            coef=self.coef[features], document_frequency=self.document_frequency[features])
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            if int(saved['format']) != MODEL_FORMAT:
+                raise ValueError(f'Unsupported model format in {path}; retrain with `flask train-classifier --full`')
+            model = cls(n_features=int(saved['n_features']), version=int(saved['version']),
+                        trained_through=str(saved['trained_through']))
+            features = saved['features']
+            model.coef[features] = saved['coef']
+            model.document_frequency[features] = saved['document_frequency']
+            model.document_count = int(saved['document_count'])
+            model.intercept = float(saved['intercept'])
+        model._update_idf()
+        return model
+
+def saved_model_version(path):
+    """Version number of the model saved at path, whatever its format."""
+    with np.load(path) as saved:
+        return int(saved['version'])
+
+def publish_model(model, model_path):
+    """Save model as a numbered artifact next to model_path, then make it the live model.
+
+    e.g. models/linear-v7.npz is written and copied over models/linear.npz, which
+    running apps pick up through ClassifierHandle. Returns the artifact path.
+    """
+    base, extension = os.path.splitext(model_path)
+    artifact = f'{base}-v{model.model_version}{extension}'
+    model.save(artifact)
+    temp_path = f'{model_path}.part'
+    shutil.copyfile(artifact, temp_path)
+    os.replace(temp_path, model_path)
+    return artifact
+
+ENGINES = {
+    'keyword': KeywordClassifier,
+    'linear': LinearClassifier,
+}
+
+def load_classifier(engine, model_path):
+    """The configured engine, falling back to the keyword scorer when no model is usable."""
+    if engine == 'keyword':
+        return KeywordClassifier()
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown classifier engine {engine!r}')
+    if np is None:
+        logger.warning('numpy/scipy/scikit-learn are not installed; using the keyword classifier')
+        return KeywordClassifier()
+    if not os.path.exists(model_path):
+        logger.warning('No model at %s; using the keyword classifier until one is trained', model_path)
+        return KeywordClassifier()
+    return LinearClassifier.load(model_path)
+
+class ClassifierHandle:
+    """The configured classifier, reloaded when its model file changes on disk.
+
+    The file's modification time is checked at most every check_interval seconds, so a
+    newly published model goes live without restarting the app. If the new file cannot
+    be loaded the previous model keeps serving.
+    """
+
+    def __init__(self, engine, model_path, check_interval):
+        self.engine = engine
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = self._model_mtime()
+        try:
+            self._classifier = load_classifier(engine, model_path)
+        except ValueError as error:  # e.g. a model saved in an older format
+            logger.warning('%s; using the keyword classifier', error)
+            self._classifier = KeywordClassifier()
+        self._next_check = time.monotonic() + check_interval
+
+    def _model_mtime(self):
+        try:
+            return os.stat(self.model_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self):
+        if self.engine == 'keyword' or time.monotonic() < self._next_check:
+            return self._classifier
+        with self._lock:
+            if time.monotonic() >= self._next_check:
+                self._next_check = time.monotonic() + self.check_interval
+                mtime = self._model_mtime()
+                if mtime != self._mtime:
+                    self._mtime = mtime
+                    try:
+                        self._classifier = load_classifier(self.engine, self.model_path)
+                        logger.info('Loaded classifier %s', self._classifier.version)
+                    except Exception:
+                        logger.exception('Could not reload %s; keeping %s', self.model_path, self._classifier.version)
+        return self._classifier
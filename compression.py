@@ -0,0 +1,32 @@
+# compression.py - gzip/brotli encoding of larger responses
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it clients get gzip
+    brotli = None
+
+def compress_response(response, accept_encodings, min_bytes, level=6):
+    """Encode the response body with the best encoding the client accepts.
+
+    Bodies under min_bytes, streamed or already encoded responses are left alone.
+    Returns the response.
+    """
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code >= 300):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+
+    if brotli is not None and accept_encodings['br']:
+        encoding, data = 'br', brotli.compress(data, quality=level - 1)
+    elif accept_encodings['gzip']:
+        encoding, data = 'gzip', gzip.compress(data, compresslevel=level, mtime=0)
+    else:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
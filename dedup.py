@@ -0,0 +1,90 @@
+# dedup.py - MinHash signatures and an LSH index for spotting near-duplicate articles
+
+import hashlib
+import re
+from array import array
+
+NUM_BINS = 64          # signature length
+BANDS = 8              # LSH bands of ROWS values each; pairs above ~0.77 similarity
+ROWS = NUM_BINS // BANDS  # almost always share at least one band
+SHINGLE_SIZE = 3       # words per shingle
+MAX_CANDIDATES = 500   # cap on rows compared per lookup, in case a bucket gets crowded
+
+_WORD = re.compile(r'\w+')
+_EMPTY = 1 << 64
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def shingles(text):
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(text):
+    """One-permutation MinHash of the text's word shingles, or None for empty text.
+
+    Each shingle is hashed once and kept only if it is the minimum of its bin, so the cost
+    is linear in the text length rather than text length x signature length. Empty bins
+    borrow from the next filled bin (rotation densification) so short texts still compare.
+    """
+    signature = [_EMPTY] * NUM_BINS
+    for shingle in shingles(text):
+        value = _hash64(shingle.encode('utf-8'))
+        bin_index = value % NUM_BINS
+        value //= NUM_BINS
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+    if all(value == _EMPTY for value in signature):
+        return None
+
+    densified = list(signature)
+    for i in range(NUM_BINS):
+        distance = 1
+        while densified[i] == _EMPTY:
+            source = signature[(i + distance) % NUM_BINS]
+            if source != _EMPTY:
+                densified[i] = source + distance * (_EMPTY // NUM_BINS)
+            distance += 1
+    return densified
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the two texts behind two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_BINS
+
+def band_buckets(signature):
+    """(band, bucket) pairs under which a signature is filed in article_lsh."""
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(array('Q', values).tobytes(), digest_size=8)
+        buckets.append((band, int.from_bytes(digest.digest(), 'big', signed=True)))
+    return buckets
+
+def pack(signature):
+    return array('Q', signature).tobytes()
+
+def unpack(blob):
+    return array('Q', blob).tolist()
+
+def index_signature(conn, article_id, signature):
+    conn.execute('INSERT OR REPLACE INTO article_minhash (article_id, signature) VALUES (?, ?)',
+                 (article_id, pack(signature)))
+    conn.executemany('INSERT OR IGNORE INTO article_lsh (band, bucket, article_id) VALUES (?, ?, ?)',
+                     [(band, bucket, article_id) for band, bucket in band_buckets(signature)])
+
+def find_near_duplicates(conn, signature, threshold):
+    """Indexed articles whose estimated similarity is at least threshold, best first.
+
+    Only articles sharing an LSH bucket are compared, so the cost depends on how many
+    near-duplicates exist, not on the size of the table.
+    """
+    buckets = band_buckets(signature)
+    where = ' OR '.join('(l.band = ? AND l.bucket = ?)' for _ in buckets)
+    params = [value for bucket in buckets for value in bucket]
+    rows = conn.execute(f'''SELECT DISTINCT m.article_id, m.signature FROM article_lsh l
+                            JOIN article_minhash m ON m.article_id = l.article_id
+                            WHERE {where} LIMIT {MAX_CANDIDATES}''', params).fetchall()
+    matches = [(row[0], similarity(signature, unpack(row[1]))) for row in rows]
+    return sorted((match for match in matches if match[1] >= threshold), key=lambda m: -m[1])
@@ -0,0 +1,94 @@
+# events.py - In-process publish/subscribe of queue changes, streamed to browsers as server-sent events
+
+import json
+import queue
+import threading
+from collections import deque
+
+class EventBroker:
+    """Fans published events out to every subscriber in this process.
+
+    Each event gets an increasing id and is kept in a short history, so a client that
+    reconnects with Last-Event-ID gets what it missed. A subscriber that falls more than
+    max_queued events behind is dropped rather than letting memory grow; its stream ends
+    and the browser reconnects and catches up from the history.
+    """
+
+    def __init__(self, history=1000, max_queued=500):
+        self.max_queued = max_queued
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event, data):
+        with self._lock:
+            message = (self._next_id, event, json.dumps(data))
+            self._next_id += 1
+            self._history.append(message)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self._subscribers.discard(subscriber)
+                    subscriber.put_nowait_closed()
+
+    def subscribe(self, last_event_id=None):
+        """A new subscription, primed with the events after last_event_id.
+
+        If those events are no longer in the history (or the id is from before a restart),
+        a 'reset' event tells the client to reload instead.
+        """
+        subscriber = Subscription(self.max_queued)
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._next_id - 1:
+                missed = [message for message in self._history if message[0] > last_event_id]
+                if not missed or missed[0][0] != last_event_id + 1 or len(missed) > self.max_queued:
+                    missed = [(self._next_id - 1, 'reset', '{}')]
+                for message in missed:
+                    subscriber.put_nowait(message)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+class Subscription(queue.Queue):
+    """Bounded queue of (id, event, json) messages; None marks a dropped subscription."""
+
+    def __init__(self, max_queued):
+        super().__init__(max_queued)
+
+    def put_nowait_closed(self):
+        # The queue is full. Make room for the end marker by dropping the newest message, not
+        # the oldest: what the client receives stays a gap-free run, so its Last-Event-ID is
+        # below every message it missed and the history replays them all on reconnect
+        with self.mutex:
+            if self.queue:
+                self.queue.pop()
+        self.put_nowait(None)
+
+def sse_stream(broker, subscriber, heartbeat):
+    """Yield a subscription as text/event-stream chunks until the client goes away.
+
+    A comment line every heartbeat seconds keeps proxies from closing an idle stream.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                message = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            if message is None:
+                return
+            event_id, event, data = message
+            yield f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,68 @@
+# images.py - Thumbnails and web-sized variants of uploaded article images
+
+import os
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it pages keep showing the originals
+    Image = None
+
+# Variant name -> longest side in pixels
+VARIANTS = {
+    'thumb': 320,
+    'web': 1280,
+}
+DERIVED_DIR = 'derived'
+
+def variant_name(stored_name, variant):
+    """Derived file name for a content-addressed upload, e.g. <sha256>_thumb.webp."""
+    return f"{stored_name.rsplit('.', 1)[0]}_{variant}.webp"
+
+def make_derivatives(source_path, upload_folder):
+    """Write every missing variant of one upload. Safe to run more than once."""
+    if Image is None:
+        return
+    derived_folder = os.path.join(upload_folder, DERIVED_DIR)
+    os.makedirs(derived_folder, exist_ok=True)
+    stored_name = os.path.basename(source_path)
+
+    with Image.open(source_path) as original:
+        original.load()
+        for variant, max_side in VARIANTS.items():
+            target = os.path.join(derived_folder, variant_name(stored_name, variant))
+            # Uploads are content-addressed, so an existing variant is always current
+            if os.path.exists(target):
+                continue
+            image = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+            image.thumbnail((max_side, max_side))
+            fd, temp_path = tempfile.mkstemp(dir=derived_folder, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, 'WEBP', quality=80, method=4)
+                os.replace(temp_path, target)
+            finally:
+                # Only left behind if the save or the rename failed
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+
+class VariantResolver:
+    """Maps an article's image_path to a variant URL once that variant exists on disk.
+
+    Until the background job has written it, the original image_path is returned.
+    """
+
+    def __init__(self, upload_folder, url_prefix):
+        self.upload_folder = upload_folder
+        self.url_prefix = url_prefix
+        self._ready = set()
+
+    def __call__(self, image_path, variant='thumb'):
+        if not image_path:
+            return image_path
+        name = variant_name(image_path.rsplit('/', 1)[-1], variant)
+        if name not in self._ready:
+            if not os.path.exists(os.path.join(self.upload_folder, DERIVED_DIR, name)):
+                return image_path
+            self._ready.add(name)
+        return f'{self.url_prefix}/{DERIVED_DIR}/{name}'
@@ -0,0 +1,160 @@
+# metrics.py - Per-route latency histograms, per-stage timings and slow-request profiles
+
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import (Response, before_render_template, current_app, g, has_request_context, request,
+                   template_rendered)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label combination."""
+
+    def __init__(self, name, description, label_names, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return '\n'.join(lines)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by route.',
+                            ('route', 'method', 'status'))
+STAGE_SECONDS = Histogram('http_request_stage_seconds',
+                          'Time each request spent per stage; "python" is whatever no other stage covers.',
+                          ('route', 'stage'))
+
+# Stage timing. Each request keeps a stack of open stages, and time is charged to the
+# innermost one, so the stages of a request add up to its total (e.g. SQL run by the
+# classifier's cache lookups counts as sql, not classify).
+
+def enter_stage(stage):
+    if not has_request_context() or '_stage_stack' not in g:
+        return None
+    frame = [stage, time.perf_counter(), 0.0]
+    g._stage_stack.append(frame)
+    return frame
+
+def exit_stage(frame):
+    if frame is None:
+        return
+    elapsed = time.perf_counter() - frame[1]
+    stack = g._stage_stack
+    stack.pop()
+    g._stage_totals[frame[0]] = g._stage_totals.get(frame[0], 0.0) + elapsed - frame[2]
+    if stack:
+        stack[-1][2] += elapsed
+
+@contextmanager
+def timed(stage):
+    """Charge the enclosed code to a stage. Also usable as a function decorator."""
+    frame = enter_stage(stage)
+    try:
+        yield
+    finally:
+        exit_stage(frame)
+
+# cProfile can only be enabled once per process at a time (a second enable raises on
+# Python 3.12+), so concurrent requests are profiled one at a time and the rest skipped.
+_profiler_lock = threading.Lock()
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _start_request():
+    g._stage_stack = []
+    g._stage_totals = {}
+    g._request_started = time.perf_counter()
+    if current_app.config['PROFILE_SLOW_REQUESTS'] is not None and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # some other tool's profiler is active
+            _profiler_lock.release()
+            return
+        g._profiler = profiler
+
+def _record_status(response):
+    g._status = response.status_code
+    return response
+
+def _finish_request(error=None):
+    started = g.pop('_request_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profiler_lock.release()
+    route = _route()
+    REQUEST_SECONDS.observe((route, request.method, str(g.pop('_status', 500))), elapsed)
+    totals = g.pop('_stage_totals', {})
+    for stage, seconds in totals.items():
+        STAGE_SECONDS.observe((route, stage), seconds)
+    STAGE_SECONDS.observe((route, 'python'), max(elapsed - sum(totals.values()), 0.0))
+
+    threshold = current_app.config['PROFILE_SLOW_REQUESTS']
+    if profiler is not None and elapsed >= threshold:
+        folder = current_app.config['PROFILE_DIR']
+        os.makedirs(folder, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        # Open with `python -m pstats` or snakeviz
+        profiler.dump_stats(os.path.join(folder, f'{stamp}-{request.method}-{name}-{elapsed * 1000:.0f}ms.prof'))
+
+def _render_started(sender, template, context, **extra):
+    g._render_frames = g.get('_render_frames', [])
+    g._render_frames.append(enter_stage('render'))
+
+def _render_finished(sender, template, context, **extra):
+    frames = g.get('_render_frames')
+    if frames:
+        exit_stage(frames.pop())
+
+def metrics_view():
+    """Prometheus text exposition of this process's histograms."""
+    body = '\n'.join(histogram.render() for histogram in (REQUEST_SECONDS, STAGE_SECONDS)) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    app.config.setdefault('PROFILE_SLOW_REQUESTS', None)
+    app.config.setdefault('PROFILE_DIR', 'profiles')
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
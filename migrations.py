@@ -0,0 +1,166 @@
+# migrations.py - Versioned schema changes applied on top of init_db's base tables
+
+from datetime import datetime
+import changes
+import sources
+import stats
+
+# (version, name, statements). Append new migrations; never edit or reorder applied ones.
+MIGRATIONS = [
+    (1, 'dashboard indexes', [
+        # user_dashboard: a user's history, newest first
+        'CREATE INDEX IF NOT EXISTS idx_articles_submitter ON articles (submitted_by, submitted_at)',
+        # reviewer_dashboard: pending queue, newest first
+        'CREATE INDEX IF NOT EXISTS idx_articles_status_submitted ON articles (status, submitted_at)',
+        # reviewer_dashboard: a reviewer's history, newest first
+        'CREATE INDEX IF NOT EXISTS idx_articles_reviewer ON articles (reviewed_by, reviewed_at)',
+        # admin_dashboard: flagged articles awaiting admin verification
+        'CREATE INDEX IF NOT EXISTS idx_articles_admin_queue ON articles (needs_admin_review, admin_verified, reviewed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)',
+    ]),
+    (2, 'dashboard counters', [stats.install_counters, stats.rebuild_counters]),
+    (3, 'classification cache', [
+        '''CREATE TABLE IF NOT EXISTS classification_cache (
+            content_hash TEXT PRIMARY KEY,
+            ml_prediction TEXT NOT NULL,
+            ml_confidence REAL NOT NULL,
+            reliable_source_json TEXT,
+            created_at TEXT NOT NULL
+        )''',
+    ]),
+    (4, 'near-duplicate index', [
+        '''CREATE TABLE IF NOT EXISTS article_minhash (
+            article_id INTEGER PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+            signature BLOB NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS article_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+            PRIMARY KEY (band, bucket, article_id)
+        ) WITHOUT ROWID''',
+        'ALTER TABLE articles ADD COLUMN duplicate_of INTEGER REFERENCES articles(id)',
+        'ALTER TABLE articles ADD COLUMN duplicate_similarity REAL',
+    ]),
+    (5, 'full-text search', [
+        # External-content index: article text is stored once, in articles
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, text, content='articles', content_rowid='id'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, text) VALUES (NEW.id, NEW.title, NEW.text);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, text) VALUES ('delete', OLD.id, OLD.title, OLD.text);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, text ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, text) VALUES ('delete', OLD.id, OLD.title, OLD.text);
+            INSERT INTO articles_fts (rowid, title, text) VALUES (NEW.id, NEW.title, NEW.text);
+        END''',
+        "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+    ]),
+    (6, 'training stream index', [
+        # Lets train-classifier read verdicts in label order a chunk at a time
+        '''CREATE INDEX IF NOT EXISTS idx_articles_labelled
+           ON articles (COALESCE(admin_verified_at, reviewed_at), id) WHERE final_verdict IS NOT NULL''',
+    ]),
+    (7, 'background classification queue', [
+        # Set while an article waits for its ML prediction
+        'ALTER TABLE articles ADD COLUMN classifying INTEGER NOT NULL DEFAULT 0',
+        '''CREATE TABLE IF NOT EXISTS job_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            available_at REAL NOT NULL,  -- unix time; pushed forward while a job is leased
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_job_queue_due ON job_queue (kind, available_at, id)',
+    ]),
+    (8, 'shared source sets', [
+        # Id is a hash of the source list (see sources.source_set_id), so equal lists share a row
+        '''CREATE TABLE IF NOT EXISTS source_sets (
+            id INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS sources (
+            source_set_id INTEGER NOT NULL REFERENCES source_sets(id),
+            position INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            uri TEXT NOT NULL,
+            PRIMARY KEY (source_set_id, position)
+        ) WITHOUT ROWID''',
+        'ALTER TABLE articles ADD COLUMN source_set_id INTEGER REFERENCES source_sets(id)',
+        sources.backfill_source_sets,
+        # Every article now shares one copy of its source list
+        'ALTER TABLE articles DROP COLUMN reliable_source_json',
+    ]),
+    (9, 'reviewer claims', [
+        # A pending article is leased to claimed_by until claim_expires_at; after that anyone may claim it
+        'ALTER TABLE articles ADD COLUMN claimed_by INTEGER REFERENCES users(id)',
+        'ALTER TABLE articles ADD COLUMN claim_expires_at TEXT',
+        # reviewer_dashboard: the reviewer's own batch, oldest first
+        '''CREATE INDEX IF NOT EXISTS idx_articles_claims
+           ON articles (claimed_by, submitted_at) WHERE status = 'pending' ''',
+    ]),
+    (10, 'change versions', [changes.install_change_versions]),
+    (11, 'classification cache source sets', [
+        # Cached results point at a shared source set, like articles do (migration 8). The
+        # rows are only a cache, so they are dropped rather than converted.
+        'DELETE FROM classification_cache',
+        'ALTER TABLE classification_cache DROP COLUMN reliable_source_json',
+        'ALTER TABLE classification_cache ADD COLUMN source_set_id INTEGER REFERENCES source_sets(id)',
+        # purge(): expiry and the row cap both walk rows oldest first
+        'CREATE INDEX IF NOT EXISTS idx_classification_cache_created ON classification_cache (created_at)',
+    ]),
+    (12, 'strip snippet markers', [
+        # Search marks matches with \x02/\x03 (app.search) and new submissions are stored
+        # without them; the FTS update trigger reindexes the rows changed here
+        '''UPDATE articles SET title = replace(replace(title, char(2), ''), char(3), ''),
+                               text = replace(replace(text, char(2), ''), char(3), '')
+           WHERE instr(title, char(2)) OR instr(title, char(3)) OR instr(text, char(2)) OR instr(text, char(3))''',
+    ]),
+]
+
+def applied_versions(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )''')
+    conn.commit()
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def migrate(conn):
+    """Apply every migration not yet recorded in schema_migrations. Returns the versions applied."""
+    done = applied_versions(conn)
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done:
+            continue
+        # Each migration and its bookkeeping row commit together or not at all
+        with conn:
+            conn.execute('BEGIN')
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute('INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                         (version, name, datetime.now().isoformat()))
+        applied.append(version)
+    return applied
+
+def find_slow_plans(conn, queries):
+    """Run EXPLAIN QUERY PLAN over {name: (sql, params)} and report full scans and sorts.
+
+    Returns a list of (name, plan detail) for every step that scans a table or
+    needs a temporary B-tree to sort, i.e. is not served by an index.
+    """
+    problems = []
+    for name, (sql, params) in queries.items():
+        for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params):
+            detail = row[3]
+            if detail.startswith('SCAN') or 'TEMP B-TREE' in detail:
+                problems.append((name, detail))
+    return problems
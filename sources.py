@@ -0,0 +1,175 @@
+# sources.py - Reliable sources for articles: topic routing and shared, normalized source lists
+
+import hashlib
+import json
+import re
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+# Checked in order: the first topic with a keyword anywhere in the title wins.
+# The topic without keywords is the fallback.
+DEFAULT_TOPICS = [
+    {'name': 'Climate Science', 'keywords': ['climate'], 'sources': [
+        {'title': 'NASA Climate Change', 'uri': 'https://climate.nasa.gov/'},
+        {'title': 'NOAA Climate.gov', 'uri': 'https://www.climate.gov/'},
+    ]},
+    {'name': 'Health', 'keywords': ['vaccine', 'health'], 'sources': [
+        {'title': 'CDC - Centers for Disease Control', 'uri': 'https://www.cdc.gov/'},
+        {'title': 'WHO - World Health Organization', 'uri': 'https://www.who.int/'},
+    ]},
+    {'name': 'Finance', 'keywords': ['earnings', 'stock'], 'sources': [
+        {'title': 'Wall Street Journal', 'uri': 'https://www.wsj.com/'},
+        {'title': 'Bloomberg', 'uri': 'https://www.bloomberg.com/'},
+    ]},
+    {'name': 'General News', 'keywords': [], 'sources': [
+        {'title': 'Associated Press News', 'uri': 'https://apnews.com/'},
+        {'title': 'Reuters Fact-Check', 'uri': 'https://www.reuters.com/fact-check/'},
+    ]},
+]
+
+# One interned source list. `json` is serialized once and shared by every caller.
+SourceSet = namedtuple('SourceSet', 'id topic sources json')
+
+def load_topics(path=None):
+    """Topic table from a JSON file shaped like DEFAULT_TOPICS, or the built-in one."""
+    if path is None:
+        return DEFAULT_TOPICS
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+class TopicRouter:
+    """Maps titles to source sets with one compiled keyword pattern.
+
+    The pattern is a lookahead tried at every position of the title, with each topic's
+    keywords listed in topic order. A keyword inside a longer one is still found, and
+    at any one position the earlier topic wins.
+    """
+
+    def __init__(self, topics):
+        # Content hash of the table, so results routed with another table are not reused
+        self.version = hashlib.sha256(json.dumps(topics, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        self.source_sets = []
+        by_json = {}
+        self._keyword_rank = {}
+        self._rank_sets = []
+        self.fallback = None
+        for topic in topics:
+            sources_json = json.dumps(topic['sources'])
+            source_set = by_json.get(sources_json)
+            if source_set is None:
+                source_set = SourceSet(len(self.source_sets) + 1, topic['name'], tuple(topic['sources']), sources_json)
+                by_json[sources_json] = source_set
+                self.source_sets.append(source_set)
+            keywords = [keyword.lower() for keyword in topic['keywords']]
+            if not keywords:
+                self.fallback = self.fallback or source_set
+                continue
+            rank = len(self._rank_sets)
+            self._rank_sets.append(source_set)
+            for keyword in keywords:
+                self._keyword_rank.setdefault(keyword, rank)
+        if self.fallback is None:
+            raise ValueError('The topic table needs one topic without keywords as the fallback')
+        ordered = sorted(self._keyword_rank, key=lambda keyword: self._keyword_rank[keyword])
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))') if ordered else None
+
+    def route(self, title):
+        """The SourceSet for a title."""
+        if self._pattern is None:
+            return self.fallback
+        best = None
+        for match in self._pattern.finditer(title.lower()):
+            rank = self._keyword_rank[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return self.fallback if best is None else self._rank_sets[best]
+
+def source_set_id(sources_json):
+    """Id of a source list: the first 8 bytes of the SHA-256 of its JSON.
+
+    Derived from the content, so the same list gets the same id in every process and
+    database, and nothing needs to be looked up before an article can point at it.
+    """
+    return int.from_bytes(hashlib.sha256(sources_json.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+class SourceSetStore:
+    """source_sets/sources rows, with the parsed lists cached in memory.
+
+    A set never changes once written (its id is its content hash), so cached entries
+    stay valid for good and dashboards only query the ids they have not seen yet.
+    """
+
+    def __init__(self):
+        self._by_json = {}
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+    def _parse(self, sources_json):
+        entry = self._by_json.get(sources_json)
+        if entry is None:
+            try:
+                sources = tuple({'title': source['title'], 'uri': source['uri']}
+                                for source in json.loads(sources_json))
+            except (ValueError, TypeError, KeyError):
+                return None
+            entry = (source_set_id(json.dumps(list(sources))), sources)
+            with self._lock:
+                self._by_json[sources_json] = entry
+                self._by_id[entry[0]] = sources
+        return entry
+
+    def intern(self, conn, sources_json):
+        """Id of the set for a JSON source list, writing it if new (None if unusable). Caller commits."""
+        entry = self._parse(sources_json) if sources_json else None
+        if entry is None:
+            return None
+        set_id, sources = entry
+        if conn.execute('INSERT OR IGNORE INTO source_sets (id, created_at) VALUES (?, ?)',
+                        (set_id, datetime.now().isoformat())).rowcount:
+            conn.executemany('INSERT INTO sources (source_set_id, position, title, uri) VALUES (?, ?, ?, ?)',
+                             [(set_id, position, source['title'], source['uri'])
+                              for position, source in enumerate(sources)])
+        return set_id
+
+    def restore(self, conn, set_ids):
+        """Rewrite any of set_ids this process interned whose rows are missing. Caller commits.
+
+        Ids kept in memory outlive the transaction that wrote their rows, which may have
+        been rolled back.
+        """
+        for set_id in set(set_ids):
+            sources = self._by_id.get(set_id)
+            if sources is not None:
+                self.intern(conn, json.dumps(list(sources)))
+
+    def lookup(self, conn, set_ids):
+        """{id: tuple of {'title', 'uri'} dicts} for the given ids; unknown ids are left out."""
+        wanted = {set_id for set_id in set_ids if set_id is not None}
+        missing = [set_id for set_id in wanted if set_id not in self._by_id]
+        if missing:
+            placeholders = ', '.join('?' * len(missing))
+            rows = conn.execute(f'''SELECT source_set_id, title, uri FROM sources
+                                    WHERE source_set_id IN ({placeholders})
+                                    ORDER BY source_set_id, position''', missing).fetchall()
+            loaded = {}
+            for set_id, title, uri in rows:
+                loaded.setdefault(set_id, []).append({'title': title, 'uri': uri})
+            with self._lock:
+                self._by_id.update((set_id, tuple(sources)) for set_id, sources in loaded.items())
+        return {set_id: self._by_id[set_id] for set_id in wanted if set_id in self._by_id}
+
+def backfill_source_sets(conn):
+    """Point every article at the source set for its reliable_source_json (migration step)."""
+    store = SourceSetStore()
+    conn.execute('CREATE TEMP TABLE source_set_backfill (sources_json TEXT PRIMARY KEY, source_set_id INTEGER)')
+    # Parsed once per distinct list, not once per article
+    for (sources_json,) in conn.execute('''SELECT DISTINCT reliable_source_json FROM articles
+                                           WHERE reliable_source_json IS NOT NULL''').fetchall():
+        conn.execute('INSERT INTO source_set_backfill VALUES (?, ?)', (sources_json, store.intern(conn, sources_json)))
+    conn.execute('''UPDATE articles SET source_set_id = (SELECT source_set_id FROM source_set_backfill
+                                                         WHERE sources_json = articles.reliable_source_json)
+                    WHERE reliable_source_json IS NOT NULL''')
+    conn.execute('DROP TABLE source_set_backfill')
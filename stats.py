@@ -0,0 +1,83 @@
+# stats.py - Dashboard counters kept up to date by triggers on the articles table
+
+# Metric name -> condition on an articles row ({r} is the row alias: NEW, OLD or a).
+# Each metric counts the rows for which the condition holds.
+METRICS = {
+    'total': '1',
+    'pending': "{r}.status = 'pending'",
+    'reviewed': "{r}.status = 'reviewed'",
+    'admin_reviewed': "{r}.status = 'admin_reviewed'",
+    'completed': "{r}.status != 'pending'",
+    'needs_admin_review': '{r}.needs_admin_review = 1 AND {r}.admin_verified = 0',
+    'ml_real': "{r}.ml_prediction = 'Real'",
+    'ml_fake': "{r}.ml_prediction = 'Fake'",
+    'pending_ml_real': "{r}.status = 'pending' AND {r}.ml_prediction = 'Real'",
+    'pending_ml_fake': "{r}.status = 'pending' AND {r}.ml_prediction = 'Fake'",
+    'verdict_real': "{r}.status != 'pending' AND {r}.final_verdict = 'Real'",
+    'verdict_fake': "{r}.status != 'pending' AND {r}.final_verdict = 'Fake'",
+    'ai_correct': "{r}.status != 'pending' AND {r}.ml_prediction = {r}.final_verdict",
+}
+
+# Scope name -> owner of the counters row. 'all' is the system-wide row with owner 0.
+SCOPES = {
+    'all': '0',
+    'submitter': '{r}.submitted_by',
+    'reviewer': '{r}.reviewed_by',
+}
+
+# Columns whose change can move a row between counters
+TRACKED_COLUMNS = ('status', 'submitted_by', 'reviewed_by', 'ml_prediction', 'final_verdict',
+                   'needs_admin_review', 'admin_verified')
+
+def _values(row, sign=''):
+    return ', '.join(f'{sign}(CASE WHEN {condition.format(r=row)} THEN 1 ELSE 0 END)'
+                     for condition in METRICS.values())
+
+def _apply_sql(scope, row, sign):
+    """Upsert that adds (sign '') or subtracts (sign '-') one row's contribution to a scope."""
+    owner = SCOPES[scope].format(r=row)
+    columns = ', '.join(METRICS)
+    updates = ', '.join(f'{metric} = {metric} + excluded.{metric}' for metric in METRICS)
+    return (f"INSERT INTO article_counters (scope, owner_id, {columns}) "
+            f"SELECT '{scope}', {owner}, {_values(row, sign)} WHERE {owner} IS NOT NULL "
+            f"ON CONFLICT (scope, owner_id) DO UPDATE SET {updates};")
+
+def install_counters(conn):
+    """Create the counters table and (re)create its triggers. Safe to run repeatedly."""
+    metric_columns = ',\n'.join(f'        {metric} INTEGER NOT NULL DEFAULT 0' for metric in METRICS)
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS article_counters (
+        scope TEXT NOT NULL,
+        owner_id INTEGER NOT NULL,
+{metric_columns},
+        PRIMARY KEY (scope, owner_id)
+    )''')
+    for trigger in ('article_counters_insert', 'article_counters_delete', 'article_counters_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    added = '\n'.join(_apply_sql(scope, 'NEW', '') for scope in SCOPES)
+    removed = '\n'.join(_apply_sql(scope, 'OLD', '-') for scope in SCOPES)
+    conn.execute(f'CREATE TRIGGER article_counters_insert AFTER INSERT ON articles BEGIN\n{added}\nEND')
+    conn.execute(f'CREATE TRIGGER article_counters_delete AFTER DELETE ON articles BEGIN\n{removed}\nEND')
+    conn.execute(f'''CREATE TRIGGER article_counters_update AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON articles
+        BEGIN\n{removed}\n{added}\nEND''')
+
+def rebuild_counters(conn):
+    """Recompute every counter from the articles table, e.g. after restoring a backup."""
+    columns = ', '.join(METRICS)
+    sums = ', '.join(f'COALESCE(SUM(CASE WHEN {condition.format(r="a")} THEN 1 ELSE 0 END), 0)'
+                     for condition in METRICS.values())
+    conn.execute('DELETE FROM article_counters')
+    for scope, owner in SCOPES.items():
+        owner = owner.format(r='a')
+        # The system-wide row is a single aggregate over the whole table
+        group_by = '' if scope == 'all' else f'WHERE {owner} IS NOT NULL GROUP BY {owner}'
+        conn.execute(f'''INSERT INTO article_counters (scope, owner_id, {columns})
+                         SELECT '{scope}', {owner}, {sums} FROM articles a {group_by}''')
+
+def get_counters(conn, scope, owner_id=0):
+    """Counters for one scope/owner as a dict; all zeros when nothing has been counted yet."""
+    row = conn.execute('SELECT * FROM article_counters WHERE scope = ? AND owner_id = ?',
+                       (scope, owner_id)).fetchone()
+    if row is None:
+        return dict.fromkeys(METRICS, 0)
+    return {metric: row[metric] for metric in METRICS}
@@ -0,0 +1,47 @@
+# storage.py - Content-addressed storage for uploaded article images
+
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+def store_upload(stream, folder, extension, max_bytes):
+    """Stream an upload to `folder`, named by the SHA-256 of its content.
+
+    The data is hashed chunk by chunk while it is written to a temporary file, and the
+    upload is abandoned as soon as it exceeds max_bytes. If a blob with the same hash
+    already exists the temporary copy is discarded, so every distinct image is kept once.
+    Returns the stored file name.
+    """
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f'Upload exceeds {max_bytes} bytes')
+                digest.update(chunk)
+                out.write(chunk)
+
+        name = f'{digest.hexdigest()}.{extension}'
+        target = os.path.join(folder, name)
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            # Atomic, so concurrent uploads of the same image simply race to the same result
+            os.replace(temp_path, target)
+        return name
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
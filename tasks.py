@@ -0,0 +1,180 @@
+# tasks.py - Background work queues for jobs that should not hold up a request
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class LocalTaskQueue:
+    """In-process queue backed by a thread pool.
+
+    Jobs are lost if the process exits before they run, so only enqueue work that can be
+    redone later (e.g. derived files that are regenerated on demand).
+    """
+
+    def __init__(self, workers):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task-worker')
+
+    def enqueue(self, func, *args, **kwargs):
+        future = self._executor.submit(func, *args, **kwargs)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Background task failed', exc_info=error)
+
+class SQLiteJobQueue:
+    """Durable job queue in the job_queue table, drained by a pool of worker threads.
+
+    Callers insert jobs with enqueue() inside their own transaction, so a job exists
+    exactly when the row it refers to does. Workers claim a batch of item ids at a time
+    under a lease; if a worker dies mid-batch the lease runs out and the jobs are claimed
+    again, so handlers must be idempotent. When a batch fails its items are retried one by
+    one, so a single bad item cannot hold back the rest. A failing item is retried with
+    exponential backoff; after max_attempts its job is dead: it stays in the table with its
+    last error and on_dead, if given, is called with its item id.
+    """
+
+    def __init__(self, kind, connect, handler, workers, batch_size, poll_interval,
+                 lease_seconds=60, max_attempts=5, on_dead=None):
+        self.kind = kind
+        self._connect = connect
+        self._handler = handler
+        self._on_dead = on_dead
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, conn, item_ids):
+        """Add jobs on the caller's connection; they become visible when the caller commits."""
+        now = time.time()
+        conn.executemany('INSERT INTO job_queue (kind, item_id, available_at) VALUES (?, ?, ?)',
+                         [(self.kind, item_id, now) for item_id in item_ids])
+
+    def notify(self):
+        """Wake idle workers now instead of at their next poll."""
+        self._wakeup.set()
+
+    def start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'{self.kind}-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def claim(self, conn):
+        """Lease up to batch_size due jobs. Returns [(job id, item id, attempts)]."""
+        now = time.time()
+        with conn:
+            return conn.execute('''UPDATE job_queue SET available_at = ?, attempts = attempts + 1
+                                   WHERE id IN (SELECT id FROM job_queue
+                                                WHERE kind = ? AND available_at <= ? AND attempts < ?
+                                                ORDER BY available_at, id LIMIT ?)
+                                   RETURNING id, item_id, attempts''',
+                                (now + self.lease_seconds, self.kind, now, self.max_attempts,
+                                 self.batch_size)).fetchall()
+
+    def run_once(self, conn):
+        """Claim and process one batch. Returns the number of jobs completed."""
+        jobs = self.claim(conn)
+        if not jobs:
+            return 0
+        done, failed = [], []
+        try:
+            self._handler([job[1] for job in jobs])
+            done = jobs
+        except Exception as error:
+            if len(jobs) == 1:
+                logger.exception('%s job for item %s failed', self.kind, jobs[0][1])
+                failed = [(jobs[0], error)]
+            else:
+                logger.warning('%s batch of %d failed; retrying its items one by one', self.kind, len(jobs))
+                for job in jobs:
+                    try:
+                        self._handler([job[1]])
+                        done.append(job)
+                    except Exception as item_error:
+                        logger.exception('%s job for item %s failed', self.kind, job[1])
+                        failed.append((job, item_error))
+
+        now = time.time()
+        dead = [job for job, _ in failed if job[2] >= self.max_attempts]
+        with conn:
+            conn.executemany('DELETE FROM job_queue WHERE id = ?', [(job[0],) for job in done])
+            # Dead jobs keep their row (claim skips them) so `flask job-queue` can show them
+            conn.executemany('UPDATE job_queue SET available_at = ?, last_error = ? WHERE id = ?',
+                             [(now if job[2] >= self.max_attempts else now + 2 ** job[2], repr(error), job[0])
+                              for job, error in failed])
+        if dead:
+            logger.error('%s jobs for items %s failed %d times and were given up',
+                         self.kind, [job[1] for job in dead], self.max_attempts)
+            if self._on_dead is not None:
+                try:
+                    self._on_dead([job[1] for job in dead])
+                except Exception:
+                    logger.exception('%s dead-letter handler failed', self.kind)
+        return len(done)
+
+    def status(self, conn):
+        """Counts of this kind's jobs: due now, waiting (leased or backing off) and dead."""
+        now = time.time()
+        row = conn.execute('''SELECT COALESCE(SUM(attempts < ? AND available_at <= ?), 0),
+                                       COALESCE(SUM(attempts < ? AND available_at > ?), 0),
+                                       COALESCE(SUM(attempts >= ?), 0)
+                                FROM job_queue WHERE kind = ?''',
+                           (self.max_attempts, now, self.max_attempts, now, self.max_attempts, self.kind)).fetchone()
+        return {'due': row[0], 'waiting': row[1], 'dead': row[2]}
+
+    def dead_jobs(self, conn, limit=50):
+        """[(job id, item id, attempts, last error)] of the jobs that were given up on."""
+        return conn.execute('''SELECT id, item_id, attempts, last_error FROM job_queue
+                               WHERE kind = ? AND attempts >= ? ORDER BY id LIMIT ?''',
+                            (self.kind, self.max_attempts, limit)).fetchall()
+
+    def retry_dead(self, conn):
+        """Give every dead job a fresh set of attempts. Returns how many were requeued."""
+        with conn:
+            return conn.execute('''UPDATE job_queue SET attempts = 0, available_at = ?
+                                   WHERE kind = ? AND attempts >= ?''',
+                                (time.time(), self.kind, self.max_attempts)).rowcount
+
+    def _work(self):
+        conn = self._connect()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    handled = self.run_once(conn)
+                except Exception:
+                    logger.exception('%s worker could not reach the job queue', self.kind)
+                    handled = 0
+                if not handled:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+        finally:
+            conn.close()
@@ -0,0 +1,47 @@
+# conftest.py - Fixtures shared by the tests: the app on a fresh database and logged-in clients
+
+import os
+import sys
+
+import pytest
+
+# app.py and its helper modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as fake_news
+import db
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on an empty database of its own, holding only the default users."""
+    flask_app = fake_news.app
+    monkeypatch.setitem(flask_app.config, 'TESTING', True)
+    monkeypatch.setitem(flask_app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    monkeypatch.setitem(flask_app.config, 'CLASSIFIER_WORKERS', 1)
+    with flask_app.app_context():
+        fake_news.init_db()
+    yield flask_app
+    db.get_pool(flask_app).close_all()
+
+@pytest.fixture
+def conn(app):
+    """A connection of the test's own, like the CLI commands and job workers use."""
+    connection = db.connect(app.config['DATABASE'])
+    yield connection
+    connection.close()
+
+def user_id(conn, email):
+    return conn.execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone()[0]
+
+def login(app, email, password):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': password})
+    return client
+
+@pytest.fixture
+def user_client(app):
+    return login(app, 'user@system.com', 'user123')
+
+@pytest.fixture
+def reviewer_client(app):
+    return login(app, 'reviewer@system.com', 'reviewer123')
@@ -0,0 +1,84 @@
+# test_claims.py - Reviewer work-queue leases (claim_articles)
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as fake_news
+from conftest import user_id
+
+@pytest.fixture
+def reviewers(app, conn, monkeypatch):
+    """Ids of three reviewers, with REVIEW_BATCH_SIZE = 3 and 20 pending articles queued."""
+    monkeypatch.setitem(app.config, 'REVIEW_BATCH_SIZE', 3)
+    password = fake_news.generate_password_hash('x')
+    with conn:
+        conn.executemany("INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, 'reviewer')",
+                         [(f'Reviewer {i}', f'r{i}@example.com', password) for i in range(3)])
+        submitter = user_id(conn, 'user@system.com')
+        start = datetime(2024, 1, 1)
+        conn.executemany('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction,
+                                                  ml_confidence, status)
+                            VALUES (?, 'text', ?, ?, 'Real', 0.7, 'pending')''',
+                         [(f'Article {i}', submitter, (start + timedelta(minutes=i)).isoformat()) for i in range(20)])
+    return [user_id(conn, f'r{i}@example.com') for i in range(3)]
+
+def claimed(conn, reviewer_id):
+    """Ids of the reviewer's live claims."""
+    return [row[0] for row in conn.execute('''SELECT id FROM articles WHERE claimed_by = ? AND status = 'pending'
+                                                AND claim_expires_at >= ? ORDER BY id''',
+                                           (reviewer_id, datetime.now().isoformat()))]
+
+def expire_claims(conn, reviewer_id, seconds_ago):
+    expired = (datetime.now() - timedelta(seconds=seconds_ago)).isoformat()
+    with conn:
+        conn.execute('UPDATE articles SET claim_expires_at = ? WHERE claimed_by = ?', (expired, reviewer_id))
+
+def test_reviewers_get_disjoint_oldest_first_batches(conn, reviewers):
+    for reviewer_id in reviewers:
+        fake_news.claim_articles(conn, reviewer_id)
+    batches = [claimed(conn, reviewer_id) for reviewer_id in reviewers]
+    assert batches == [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+def test_claiming_again_renews_the_same_batch(conn, reviewers):
+    fake_news.claim_articles(conn, reviewers[0])
+    expires_before = conn.execute('SELECT MIN(claim_expires_at) FROM articles WHERE claimed_by = ?',
+                                  (reviewers[0],)).fetchone()[0]
+    fake_news.claim_articles(conn, reviewers[0])
+    assert claimed(conn, reviewers[0]) == [1, 2, 3]
+    assert conn.execute('SELECT MIN(claim_expires_at) FROM articles WHERE claimed_by = ?',
+                        (reviewers[0],)).fetchone()[0] >= expires_before
+
+def test_batch_is_topped_up_after_a_review(conn, reviewers):
+    fake_news.claim_articles(conn, reviewers[0])
+    with conn:
+        conn.execute('''UPDATE articles SET status = 'reviewed', final_verdict = 'Fake', reviewed_by = ?,
+                                            claimed_by = NULL, claim_expires_at = NULL
+                        WHERE id = 1''', (reviewers[0],))
+    fake_news.claim_articles(conn, reviewers[0])
+    assert claimed(conn, reviewers[0]) == [2, 3, 4]
+
+def test_expired_claims_go_to_another_reviewer(conn, reviewers):
+    fake_news.claim_articles(conn, reviewers[0])
+    expire_claims(conn, reviewers[0], 1)
+    fake_news.claim_articles(conn, reviewers[1])
+    assert claimed(conn, reviewers[1]) == [1, 2, 3]
+
+def test_lapsed_claims_skip_their_reviewer_for_one_lease(app, conn, reviewers):
+    fake_news.claim_articles(conn, reviewers[0])
+    expire_claims(conn, reviewers[0], 1)
+    fake_news.claim_articles(conn, reviewers[0])
+    assert claimed(conn, reviewers[0]) == [4, 5, 6]
+
+    # Once a further lease period has passed, nobody else took them, so they come back
+    with conn:
+        conn.execute('UPDATE articles SET claimed_by = NULL, claim_expires_at = NULL WHERE id > 3')
+    expire_claims(conn, reviewers[0], app.config['REVIEW_LEASE_SECONDS'] + 1)
+    fake_news.claim_articles(conn, reviewers[0])
+    assert claimed(conn, reviewers[0]) == [1, 2, 3]
+
+def test_articles_still_classifying_are_not_claimed(conn, reviewers):
+    with conn:
+        conn.execute('UPDATE articles SET classifying = 1 WHERE id <= 2')
+    fake_news.claim_articles(conn, reviewers[0])
+    assert claimed(conn, reviewers[0]) == [3, 4, 5]
@@ -0,0 +1,34 @@
+# test_classify.py - Batch classification and the namespace of cached results
+
+import app as fake_news
+from sources import DEFAULT_TOPICS, TopicRouter
+
+class FixedModel:
+    """A non-batched engine that is not the configured one."""
+    version = 'fixed-1'
+    batched = False
+
+    def predict(self, title, text):
+        return 'Real', 0.5
+
+def test_classify_articles_uses_the_model_it_is_given(app):
+    pairs = [('Climate hoax', 'shocking secret miracle cure')] * 3
+    results = fake_news.classify_articles(pairs, FixedModel())
+    assert [result[:2] for result in results] == [('Real', 0.5)] * 3
+    assert results[0][2] == fake_news.get_reliable_sources('Climate hoax')
+
+def test_worker_processes_use_the_model_they_are_given(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CLASSIFIER_WORKERS', 2)
+    monkeypatch.setitem(app.config, 'CLASSIFIER_CHUNK_SIZE', 2)
+    pairs = [(f'Hoax {i}', 'shocking secret miracle cure') for i in range(5)]
+    assert [result[:2] for result in fake_news.classify_articles(pairs, FixedModel())] == [('Real', 0.5)] * 5
+
+def test_cached_results_are_kept_apart_per_topic_table(app, monkeypatch):
+    rerouted = [dict(DEFAULT_TOPICS[0], keywords=['climate', 'hoax'])] + DEFAULT_TOPICS[1:]
+    pairs = [('Hoax', 'shocking secret miracle cure')]
+    with app.app_context():
+        [(_, _, before)] = fake_news.classify_cached(pairs)
+        monkeypatch.setattr(fake_news, 'get_source_router', lambda: TopicRouter(rerouted))
+        [(_, _, after)] = fake_news.classify_cached(pairs)
+    assert after != before
+    assert TopicRouter(DEFAULT_TOPICS).version == TopicRouter([dict(topic) for topic in DEFAULT_TOPICS]).version
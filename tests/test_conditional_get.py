@@ -0,0 +1,66 @@
+# test_conditional_get.py - ETag and Last-Modified handling of the JSON API
+
+import time
+
+from werkzeug.http import http_date
+
+def submit(client, title):
+    client.post('/user/dashboard', data={'title': title, 'text': 'according to a published study'})
+
+def set_changed_at(conn, timestamp):
+    with conn:
+        conn.execute('UPDATE change_versions SET changed_at = ?', (timestamp,))
+
+def test_etag_revalidates_until_the_data_changes(user_client):
+    submit(user_client, 'First')
+    response = user_client.get('/api/articles')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.cache_control.private and response.cache_control.no_cache
+
+    cached = user_client.get('/api/articles', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    submit(user_client, 'Second')
+    changed = user_client.get('/api/articles', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert [article['title'] for article in changed.json['articles']] == ['Second', 'First']
+
+def test_claiming_articles_keeps_submitters_etag(user_client, reviewer_client):
+    submit(user_client, 'First')
+    etag = user_client.get('/api/articles').headers['ETag']
+    reviewer_client.get('/reviewer/dashboard')
+    assert user_client.get('/api/articles', headers={'If-None-Match': etag}).status_code == 304
+
+def test_last_modified_waits_for_the_second_to_end(user_client, conn):
+    submit(user_client, 'First')
+    set_changed_at(conn, time.time() + 0.5)
+    assert 'Last-Modified' not in user_client.get('/api/articles').headers
+
+def test_if_modified_since_sees_changes_within_the_same_second(user_client, conn):
+    submit(user_client, 'First')
+    changed_at = int(time.time()) - 10 + 0.3
+    set_changed_at(conn, changed_at)
+    last_modified = user_client.get('/api/articles').headers['Last-Modified']
+    # The change's second is rounded up: a copy dated the start of that second is stale
+    assert last_modified == http_date(int(changed_at) + 1)
+    assert user_client.get('/api/articles', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    set_changed_at(conn, changed_at + 0.5)
+    assert user_client.get('/api/articles', headers={'If-Modified-Since': http_date(int(changed_at))}).status_code == 200
+    assert user_client.get('/api/articles', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    set_changed_at(conn, changed_at + 1)
+    assert user_client.get('/api/articles', headers={'If-Modified-Since': last_modified}).status_code == 200
+
+def test_if_none_match_wins_over_if_modified_since(user_client, conn):
+    submit(user_client, 'First')
+    set_changed_at(conn, time.time() - 10)
+    last_modified = user_client.get('/api/articles').headers['Last-Modified']
+    response = user_client.get('/api/articles', headers={'If-None-Match': 'W/"stale"',
+                                                         'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+
+def test_api_needs_a_login(app):
+    assert app.test_client().get('/api/articles').status_code == 401
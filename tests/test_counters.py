@@ -0,0 +1,49 @@
+# test_counters.py - Trigger-maintained dashboard counters agree with a full rebuild
+
+from datetime import datetime
+
+from conftest import user_id
+from stats import get_counters, rebuild_counters
+
+def counter_rows(conn):
+    """{(scope, owner_id): counters}, leaving out rows that count nothing."""
+    rows = {}
+    for row in conn.execute('SELECT * FROM article_counters'):
+        counters = {key: row[key] for key in row.keys() if key not in ('scope', 'owner_id')}
+        if any(counters.values()):
+            rows[(row['scope'], row['owner_id'])] = counters
+    return rows
+
+def test_triggers_match_rebuild_after_every_kind_of_change(conn):
+    submitter = user_id(conn, 'user@system.com')
+    reviewer = user_id(conn, 'reviewer@system.com')
+    admin = user_id(conn, 'admin@system.com')
+    now = datetime.now().isoformat()
+    with conn:
+        conn.executemany('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction, ml_confidence)
+                            VALUES (?, 'text', ?, ?, ?, 0.8)''',
+                         [(f'Article {i}', submitter, now, ('Real', 'Fake')[i % 2]) for i in range(12)])
+        conn.execute('''UPDATE articles SET status = 'reviewed', final_verdict = 'Fake', reviewed_by = ?, reviewed_at = ?
+                        WHERE id IN (1, 2, 3)''', (reviewer, now))
+        conn.execute('''UPDATE articles SET status = 'reviewed', final_verdict = 'Fake', reviewed_by = ?, reviewed_at = ?,
+                                            needs_admin_review = 1
+                        WHERE id = 4''', (reviewer, now))
+        conn.execute('''UPDATE articles SET status = 'admin_reviewed', final_verdict = 'Real', admin_verified = 1,
+                                            admin_verified_by = ?, admin_verified_at = ?, needs_admin_review = 0
+                        WHERE id IN (2, 4)''', (admin, now))
+        conn.execute('DELETE FROM articles WHERE id IN (3, 12)')
+        conn.execute("UPDATE articles SET ml_prediction = 'Real' WHERE id = 5")
+        conn.execute('UPDATE articles SET submitted_by = ? WHERE id = 6', (admin,))
+
+    maintained = counter_rows(conn)
+    with conn:
+        rebuild_counters(conn)
+    assert maintained == counter_rows(conn)
+
+    system = get_counters(conn, 'all')
+    assert (system['total'], system['pending'], system['reviewed'], system['admin_reviewed']) == (10, 7, 1, 2)
+    assert get_counters(conn, 'reviewer', reviewer)['completed'] == 3
+    assert get_counters(conn, 'submitter', admin)['total'] == 1
+
+def test_counters_of_an_unknown_owner_are_zero(conn):
+    assert set(get_counters(conn, 'reviewer', 12345).values()) == {0}
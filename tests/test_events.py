@@ -0,0 +1,24 @@
+# test_events.py - EventBroker replay for subscribers that fall behind
+
+from events import EventBroker
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.empty():
+        messages.append(subscriber.get_nowait())
+    return messages
+
+def test_dropped_subscriber_replays_everything_it_missed():
+    broker = EventBroker(history=10, max_queued=3)
+    subscriber = broker.subscribe()
+    for n in range(1, 5):
+        broker.publish('submitted', {'n': n})
+    # The fourth event overflowed the queue: the stream ends after the oldest events
+    messages = drain(subscriber)
+    assert [message[0] for message in messages[:-1]] == [1, 2]
+    assert messages[-1] is None
+    assert broker.subscriber_count() == 0
+
+    # Reconnecting with the last id it got, the client receives every later event
+    last_event_id = messages[-2][0]
+    assert [message[0] for message in drain(broker.subscribe(last_event_id))] == [3, 4]
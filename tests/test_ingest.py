@@ -0,0 +1,36 @@
+# test_ingest.py - Bulk import endpoint: malformed records and unreadable files
+
+import io
+
+def post_file(client, data, name='articles.jsonl'):
+    return client.post('/articles/bulk', data={'articles_file': (io.BytesIO(data), name)})
+
+def test_malformed_records_are_skipped_and_counted(user_client, conn):
+    response = post_file(user_client, b'{"title": "Bad", "text": 123}\n'
+                                      b'{"title": "Good", "text": "according to a study"}\n'
+                                      b'[1]\n'
+                                      b'{"title": ["x"], "text": "y"}\n'
+                                      b'not json\n')
+    assert response.status_code == 200
+    assert response.json == {'inserted': 1, 'skipped': 4}
+    assert [row[0] for row in conn.execute('SELECT title FROM articles')] == ['Good']
+
+def test_csv_rows_are_imported(user_client, conn):
+    response = post_file(user_client, b'title,text\nFirst,one\nSecond,two\n,missing title\n', 'articles.csv')
+    assert response.json == {'inserted': 2, 'skipped': 1}
+    assert conn.execute("SELECT COUNT(*) FROM articles WHERE status = 'pending'").fetchone()[0] == 2
+
+def test_csv_articles_longer_than_128_kb_are_imported(user_client, conn):
+    text = 'word ' * 60000
+    response = post_file(user_client, f'title,text\nLong,{text}\n'.encode(), 'articles.csv')
+    assert response.json == {'inserted': 1, 'skipped': 0}
+    assert conn.execute('SELECT length(text) FROM articles').fetchone()[0] == len(text)
+
+def test_undecodable_file_is_a_bad_request(user_client):
+    response = post_file(user_client, b'{"title": "a", "text": "b"}\n{"title": "\xff\xfe", "text": "b"}\n')
+    assert response.status_code == 400
+    assert 'error' in response.json
+    assert set(response.json) == {'error', 'inserted', 'skipped'}
+
+def test_reviewers_cannot_import(reviewer_client):
+    assert post_file(reviewer_client, b'{"title": "a", "text": "b"}\n').status_code == 401
@@ -0,0 +1,83 @@
+# test_job_queue.py - SQLiteJobQueue batches, failure handling and the classification dead-letter path
+
+import app as fake_news
+from tasks import SQLiteJobQueue
+
+def make_queue(handler, on_dead=None):
+    return SQLiteJobQueue('test', None, handler, workers=1, batch_size=10, poll_interval=0.1,
+                          max_attempts=3, on_dead=on_dead)
+
+def run_due(queue, conn):
+    """One run_once, with backoff skipped so retries are due at once."""
+    handled = queue.run_once(conn)
+    with conn:
+        conn.execute('UPDATE job_queue SET available_at = 0')
+    return handled
+
+def test_handled_jobs_leave_the_queue(conn):
+    handled = []
+    queue = make_queue(handled.extend)
+    with conn:
+        queue.enqueue(conn, [1, 2, 3])
+    assert queue.run_once(conn) == 3
+    assert sorted(handled) == [1, 2, 3]
+    assert conn.execute('SELECT COUNT(*) FROM job_queue').fetchone()[0] == 0
+    assert queue.run_once(conn) == 0
+
+def test_one_bad_item_does_not_hold_back_its_batch(conn):
+    handled, dead = [], []
+
+    def handler(item_ids):
+        if 13 in item_ids:
+            raise ValueError('poison')
+        handled.extend(item_ids)
+
+    queue = make_queue(handler, on_dead=dead.extend)
+    with conn:
+        queue.enqueue(conn, [11, 12, 13, 14])
+
+    assert run_due(queue, conn) == 3
+    assert sorted(handled) == [11, 12, 14]
+    assert queue.status(conn) == {'due': 1, 'waiting': 0, 'dead': 0}
+
+    assert run_due(queue, conn) == 0
+    assert run_due(queue, conn) == 0
+    assert dead == [13]
+    assert queue.status(conn) == {'due': 0, 'waiting': 0, 'dead': 1}
+    [(_, item_id, attempts, last_error)] = queue.dead_jobs(conn)
+    assert (item_id, attempts) == (13, 3) and 'poison' in last_error
+
+    # Dead jobs are left alone until requeued
+    assert run_due(queue, conn) == 0
+    assert queue.retry_dead(conn) == 1
+    assert queue.status(conn) == {'due': 1, 'waiting': 0, 'dead': 0}
+
+def test_failed_job_backs_off(conn):
+    def handler(item_ids):
+        raise RuntimeError('down')
+
+    queue = make_queue(handler)
+    with conn:
+        queue.enqueue(conn, [1])
+    assert queue.run_once(conn) == 0
+    assert queue.status(conn) == {'due': 0, 'waiting': 1, 'dead': 0}
+
+def test_dead_classification_falls_back_to_keywords(app, conn, user_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'ASYNC_CLASSIFICATION', True)
+    # Run the queue by hand instead of on worker threads
+    monkeypatch.setattr(fake_news.SQLiteJobQueue, 'start', lambda queue: None)
+    user_client.post('/user/dashboard', data={'title': 'Shocking hoax', 'text': 'a secret miracle cure'})
+    assert conn.execute('SELECT classifying FROM articles').fetchone()[0] == 1
+
+    def broken(pairs):
+        raise RuntimeError('model unavailable')
+    monkeypatch.setattr(fake_news, 'classify_cached', broken)
+    queue = fake_news.get_classification_queue()
+    for _ in range(queue.max_attempts):
+        run_due(queue, conn)
+
+    article = conn.execute('SELECT classifying, ml_prediction, source_set_id FROM articles').fetchone()
+    assert article['classifying'] == 0
+    assert article['ml_prediction'] == 'Fake'
+    assert article['source_set_id'] is not None
+    assert queue.status(conn)['dead'] == 1
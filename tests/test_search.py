@@ -0,0 +1,24 @@
+# test_search.py - Full-text search snippets and their highlighting
+
+from datetime import datetime
+
+import migrations
+from conftest import user_id
+
+def search(client, query):
+    return client.get('/search', query_string={'q': query, 'format': 'json'}).json
+
+def test_submitted_marker_characters_do_not_become_highlights(user_client, reviewer_client):
+    user_client.post('/user/dashboard', data={'title': 'Markers', 'text': 'before \x02<b>bold</b>\x03 climate after'})
+    [result] = search(reviewer_client, 'climate')
+    assert result['snippet'] == 'before &lt;b&gt;bold&lt;/b&gt; <mark>climate</mark> after'
+
+def test_migration_strips_markers_from_stored_articles(conn, reviewer_client):
+    with conn:
+        conn.execute('''INSERT INTO articles (title, text, submitted_by, submitted_at)
+                        VALUES ('Old \x02import', 'stored \x03before climate', ?, ?)''',
+                     (user_id(conn, 'user@system.com'), datetime.now().isoformat()))
+        conn.execute('DELETE FROM schema_migrations WHERE version = 12')
+    assert migrations.migrate(conn) == [12]
+    assert tuple(conn.execute('SELECT title, text FROM articles').fetchone()) == ('Old import', 'stored before climate')
+    assert search(reviewer_client, 'climate')[0]['snippet'] == 'stored before <mark>climate</mark>'
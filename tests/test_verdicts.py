@@ -0,0 +1,52 @@
+# test_verdicts.py - Verdicts applied in batches by reviewers (apply_reviews) and admins (apply_admin_verdicts)
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as fake_news
+from conftest import user_id
+
+@pytest.fixture
+def articles(conn):
+    """Five pending articles from the default user."""
+    submitter = user_id(conn, 'user@system.com')
+    with conn:
+        conn.executemany('''INSERT INTO articles (title, text, submitted_by, submitted_at, ml_prediction,
+                                                  ml_confidence, status)
+                            VALUES (?, 'text', ?, ?, 'Real', 0.7, 'pending')''',
+                         [(f'Article {i}', submitter, datetime(2024, 1, 1).isoformat()) for i in range(5)])
+
+def claim(conn, article_id, reviewer_id):
+    expires_at = (datetime.now() + timedelta(minutes=5)).isoformat()
+    with conn:
+        conn.execute('UPDATE articles SET claimed_by = ?, claim_expires_at = ? WHERE id = ?',
+                     (reviewer_id, expires_at, article_id))
+
+def statuses(conn):
+    return [tuple(row) for row in conn.execute('SELECT status, final_verdict FROM articles ORDER BY id')]
+
+def test_batch_review_applies_every_verdict(conn, articles):
+    reviewer = user_id(conn, 'reviewer@system.com')
+    assert sorted(fake_news.apply_reviews(conn, reviewer, [(1, 'Fake'), (2, 'Real'), (3, 'Fake')])) == [1, 2, 3]
+    assert statuses(conn)[:4] == [('reviewed', 'Fake'), ('reviewed', 'Real'), ('reviewed', 'Fake'), ('pending', None)]
+
+def test_reviews_of_another_reviewers_claim_are_refused(conn, articles):
+    reviewer = user_id(conn, 'reviewer@system.com')
+    claim(conn, 1, user_id(conn, 'admin@system.com'))
+    assert fake_news.apply_reviews(conn, reviewer, [(1, 'Real'), (2, 'Fake')]) == [2]
+    assert statuses(conn)[:2] == [('pending', None), ('reviewed', 'Fake')]
+
+def test_reviewed_articles_are_not_reviewed_again(conn, articles):
+    reviewer = user_id(conn, 'reviewer@system.com')
+    fake_news.apply_reviews(conn, reviewer, [(1, 'Fake')])
+    assert fake_news.apply_reviews(conn, reviewer, [(1, 'Real')]) == []
+    assert statuses(conn)[0] == ('reviewed', 'Fake')
+
+def test_admin_verdicts_skip_pending_and_finalized_articles(conn, articles):
+    reviewer = user_id(conn, 'reviewer@system.com')
+    admin = user_id(conn, 'admin@system.com')
+    fake_news.apply_reviews(conn, reviewer, [(1, 'Fake'), (2, 'Fake')])
+    assert fake_news.apply_admin_verdicts(conn, admin, [(1, 'Real'), (3, 'Real')]) == [1]
+    assert fake_news.apply_admin_verdicts(conn, admin, [(1, 'Fake'), (2, 'Real')]) == [2]
+    assert statuses(conn)[:3] == [('admin_reviewed', 'Real'), ('admin_reviewed', 'Real'), ('pending', None)]